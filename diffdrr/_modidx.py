@@ -13,6 +13,8 @@ d = { 'settings': { 'branch': 'main',
                                   'diffdrr.detector.Detector.__init__': ('api/detector.html#detector.__init__', 'diffdrr/detector.py'),
                                   'diffdrr.detector.Detector._initialize_carm': ( 'api/detector.html#detector._initialize_carm',
                                                                                   'diffdrr/detector.py'),
+                                  'diffdrr.detector.Detector._load_from_state_dict': ( 'api/detector.html#detector._load_from_state_dict',
+                                                                                       'diffdrr/detector.py'),
                                   'diffdrr.detector.Detector.calibration': ( 'api/detector.html#detector.calibration',
                                                                              'diffdrr/detector.py'),
                                   'diffdrr.detector.Detector.delx': ('api/detector.html#detector.delx', 'diffdrr/detector.py'),
@@ -23,6 +25,19 @@ d = { 'settings': { 'branch': 'main',
                                   'diffdrr.detector.Detector.sdd': ('api/detector.html#detector.sdd', 'diffdrr/detector.py'),
                                   'diffdrr.detector.Detector.x0': ('api/detector.html#detector.x0', 'diffdrr/detector.py'),
                                   'diffdrr.detector.Detector.y0': ('api/detector.html#detector.y0', 'diffdrr/detector.py'),
+                                  'diffdrr.detector.PixelSampler': ('api/detector.html#pixelsampler', 'diffdrr/detector.py'),
+                                  'diffdrr.detector.PixelSampler.__init__': ( 'api/detector.html#pixelsampler.__init__',
+                                                                              'diffdrr/detector.py'),
+                                  'diffdrr.detector.PixelSampler.forward': ( 'api/detector.html#pixelsampler.forward',
+                                                                             'diffdrr/detector.py'),
+                                  'diffdrr.detector.PixelSampler.resample_': ( 'api/detector.html#pixelsampler.resample_',
+                                                                               'diffdrr/detector.py'),
+                                  'diffdrr.detector.PixelSampler.set_importance_': ( 'api/detector.html#pixelsampler.set_importance_',
+                                                                                     'diffdrr/detector.py'),
+                                  'diffdrr.detector._blue_noise_mask': ('api/detector.html#_blue_noise_mask', 'diffdrr/detector.py'),
+                                  'diffdrr.detector._blue_noise_sample': ('api/detector.html#_blue_noise_sample', 'diffdrr/detector.py'),
+                                  'diffdrr.detector._get_roi_idxs': ('api/detector.html#_get_roi_idxs', 'diffdrr/detector.py'),
+                                  'diffdrr.detector._stratified_sample': ('api/detector.html#_stratified_sample', 'diffdrr/detector.py'),
                                   'diffdrr.detector.get_focal_length': ('api/detector.html#get_focal_length', 'diffdrr/detector.py'),
                                   'diffdrr.detector.get_principal_point': ('api/detector.html#get_principal_point', 'diffdrr/detector.py'),
                                   'diffdrr.detector.make_intrinsic_matrix': ( 'api/detector.html#make_intrinsic_matrix',
@@ -30,19 +45,48 @@ d = { 'settings': { 'branch': 'main',
                                   'diffdrr.detector.parse_intrinsic_matrix': ( 'api/detector.html#parse_intrinsic_matrix',
                                                                                'diffdrr/detector.py')},
             'diffdrr.drr': { 'diffdrr.drr.DRR': ('api/drr.html#drr', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.__getstate__': ('api/drr.html#drr.__getstate__', 'diffdrr/drr.py'),
                              'diffdrr.drr.DRR.__init__': ('api/drr.html#drr.__init__', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR._cached': ('api/drr.html#drr._cached', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR._check_batch_size': ('api/drr.html#drr._check_batch_size', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR._render_rescaled': ('api/drr.html#drr._render_rescaled', 'diffdrr/drr.py'),
                              'diffdrr.drr.DRR.affine': ('api/drr.html#drr.affine', 'diffdrr/drr.py'),
                              'diffdrr.drr.DRR.affine_inverse': ('api/drr.html#drr.affine_inverse', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.backproject': ('api/drr.html#drr.backproject', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.chunk_size': ('api/drr.html#drr.chunk_size', 'diffdrr/drr.py'),
                              'diffdrr.drr.DRR.device': ('api/drr.html#drr.device', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.differentiate_by_backprojection': ( 'api/drr.html#drr.differentiate_by_backprojection',
+                                                                                  'diffdrr/drr.py'),
                              'diffdrr.drr.DRR.dtype': ('api/drr.html#drr.dtype', 'diffdrr/drr.py'),
                              'diffdrr.drr.DRR.forward': ('api/drr.html#drr.forward', 'diffdrr/drr.py'),
                              'diffdrr.drr.DRR.inverse_projection': ('api/drr.html#drr.inverse_projection', 'diffdrr/drr.py'),
-                             'diffdrr.drr.DRR.n_patches': ('api/drr.html#drr.n_patches', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.level_of_detail': ('api/drr.html#drr.level_of_detail', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.map_chunks': ('api/drr.html#drr.map_chunks', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.occupancy': ('api/drr.html#drr.occupancy', 'diffdrr/drr.py'),
                              'diffdrr.drr.DRR.perspective_projection': ('api/drr.html#drr.perspective_projection', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.pyramid': ('api/drr.html#drr.pyramid', 'diffdrr/drr.py'),
                              'diffdrr.drr.DRR.render': ('api/drr.html#drr.render', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.render_pixels': ('api/drr.html#drr.render_pixels', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.render_scales': ('api/drr.html#drr.render_scales', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.render_supersampled': ('api/drr.html#drr.render_supersampled', 'diffdrr/drr.py'),
                              'diffdrr.drr.DRR.rescale_detector_': ('api/drr.html#drr.rescale_detector_', 'diffdrr/drr.py'),
                              'diffdrr.drr.DRR.reshape_transform': ('api/drr.html#drr.reshape_transform', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.sampling_volume': ('api/drr.html#drr.sampling_volume', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.set_importance_': ('api/drr.html#drr.set_importance_', 'diffdrr/drr.py'),
                              'diffdrr.drr.DRR.set_intrinsics_': ('api/drr.html#drr.set_intrinsics_', 'diffdrr/drr.py'),
+                             'diffdrr.drr.DRR.system_matrix': ('api/drr.html#drr.system_matrix', 'diffdrr/drr.py'),
+                             'diffdrr.drr.SystemMatrix': ('api/drr.html#systemmatrix', 'diffdrr/drr.py'),
+                             'diffdrr.drr.SystemMatrix.__init__': ('api/drr.html#systemmatrix.__init__', 'diffdrr/drr.py'),
+                             'diffdrr.drr.SystemMatrix.backproject': ('api/drr.html#systemmatrix.backproject', 'diffdrr/drr.py'),
+                             'diffdrr.drr.SystemMatrix.forward': ('api/drr.html#systemmatrix.forward', 'diffdrr/drr.py'),
+                             'diffdrr.drr.SystemMatrix.load': ('api/drr.html#systemmatrix.load', 'diffdrr/drr.py'),
+                             'diffdrr.drr.SystemMatrix.save': ('api/drr.html#systemmatrix.save', 'diffdrr/drr.py'),
+                             'diffdrr.drr.SystemMatrix.transpose': ('api/drr.html#systemmatrix.transpose', 'diffdrr/drr.py'),
+                             'diffdrr.drr._SparseRender': ('api/drr.html#_sparserender', 'diffdrr/drr.py'),
+                             'diffdrr.drr._SparseRender.backward': ('api/drr.html#_sparserender.backward', 'diffdrr/drr.py'),
+                             'diffdrr.drr._SparseRender.forward': ('api/drr.html#_sparserender.forward', 'diffdrr/drr.py'),
+                             'diffdrr.drr._detector_key': ('api/drr.html#_detector_key', 'diffdrr/drr.py'),
+                             'diffdrr.drr._stack_volumes': ('api/drr.html#_stack_volumes', 'diffdrr/drr.py'),
                              'diffdrr.drr.reshape_subsampled_drr': ('api/drr.html#reshape_subsampled_drr', 'diffdrr/drr.py')},
             'diffdrr.metrics': { 'diffdrr.metrics.DoubleGeodesicSE3': ('api/metrics.html#doublegeodesicse3', 'diffdrr/metrics.py'),
                                  'diffdrr.metrics.DoubleGeodesicSE3.__init__': ( 'api/metrics.html#doublegeodesicse3.__init__',
@@ -159,22 +203,93 @@ d = { 'settings': { 'branch': 'main',
                                                                                       'diffdrr/registration.py'),
                                       'diffdrr.registration.Registration.translation': ( 'api/registration.html#registration.translation',
                                                                                          'diffdrr/registration.py')},
-            'diffdrr.renderers': { 'diffdrr.renderers.Siddon': ('api/renderers.html#siddon', 'diffdrr/renderers.py'),
+            'diffdrr.renderers': { 'diffdrr.renderers.DistanceDriven': ('api/renderers.html#distancedriven', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.DistanceDriven.__init__': ( 'api/renderers.html#distancedriven.__init__',
+                                                                                  'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.DistanceDriven.dims': ( 'api/renderers.html#distancedriven.dims',
+                                                                              'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.DistanceDriven.forward': ( 'api/renderers.html#distancedriven.forward',
+                                                                                 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.DistanceDriven.memory_per_ray': ( 'api/renderers.html#distancedriven.memory_per_ray',
+                                                                                        'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.Siddon': ('api/renderers.html#siddon', 'diffdrr/renderers.py'),
                                    'diffdrr.renderers.Siddon.__init__': ('api/renderers.html#siddon.__init__', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.Siddon.backproject': ( 'api/renderers.html#siddon.backproject',
+                                                                             'diffdrr/renderers.py'),
                                    'diffdrr.renderers.Siddon.dims': ('api/renderers.html#siddon.dims', 'diffdrr/renderers.py'),
                                    'diffdrr.renderers.Siddon.forward': ('api/renderers.html#siddon.forward', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.Siddon.memory_per_ray': ( 'api/renderers.html#siddon.memory_per_ray',
+                                                                                'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.Siddon.render': ('api/renderers.html#siddon.render', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.Siddon.samples': ('api/renderers.html#siddon.samples', 'diffdrr/renderers.py'),
                                    'diffdrr.renderers.Trilinear': ('api/renderers.html#trilinear', 'diffdrr/renderers.py'),
                                    'diffdrr.renderers.Trilinear.__init__': ( 'api/renderers.html#trilinear.__init__',
                                                                              'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.Trilinear.alpha_minmax': ( 'api/renderers.html#trilinear.alpha_minmax',
+                                                                                 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.Trilinear.backproject': ( 'api/renderers.html#trilinear.backproject',
+                                                                                'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.Trilinear.differentiate_pose_only': ( 'api/renderers.html#trilinear.differentiate_pose_only',
+                                                                                            'diffdrr/renderers.py'),
                                    'diffdrr.renderers.Trilinear.dims': ('api/renderers.html#trilinear.dims', 'diffdrr/renderers.py'),
                                    'diffdrr.renderers.Trilinear.forward': ('api/renderers.html#trilinear.forward', 'diffdrr/renderers.py'),
-                                   'diffdrr.renderers._filter_intersections_outside_volume': ( 'api/renderers.html#_filter_intersections_outside_volume',
-                                                                                               'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.Trilinear.max_n_points': ( 'api/renderers.html#trilinear.max_n_points',
+                                                                                 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.Trilinear.memory_per_ray': ( 'api/renderers.html#trilinear.memory_per_ray',
+                                                                                   'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.Trilinear.samples': ('api/renderers.html#trilinear.samples', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._LinearRender': ('api/renderers.html#_linearrender', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._LinearRender.backward': ( 'api/renderers.html#_linearrender.backward',
+                                                                                 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._LinearRender.forward': ( 'api/renderers.html#_linearrender.forward',
+                                                                                'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._MemoryEfficientRender': ( 'api/renderers.html#_memoryefficientrender',
+                                                                                 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._MemoryEfficientRender.backward': ( 'api/renderers.html#_memoryefficientrender.backward',
+                                                                                          'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._MemoryEfficientRender.forward': ( 'api/renderers.html#_memoryefficientrender.forward',
+                                                                                         'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._PoseOnlyRender': ('api/renderers.html#_poseonlyrender', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._PoseOnlyRender.backward': ( 'api/renderers.html#_poseonlyrender.backward',
+                                                                                   'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._PoseOnlyRender.forward': ( 'api/renderers.html#_poseonlyrender.forward',
+                                                                                  'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._backproject': ('api/renderers.html#_backproject', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._clip_to_occupancy': ( 'api/renderers.html#_clip_to_occupancy',
+                                                                             'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._count_following': ('api/renderers.html#_count_following', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._count_preceding': ('api/renderers.html#_count_preceding', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._downsample_labels': ( 'api/renderers.html#_downsample_labels',
+                                                                             'diffdrr/renderers.py'),
                                    'diffdrr.renderers._get_alpha_minmax': ('api/renderers.html#_get_alpha_minmax', 'diffdrr/renderers.py'),
                                    'diffdrr.renderers._get_alphas': ('api/renderers.html#_get_alphas', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_batch_idxs': ('api/renderers.html#_get_batch_idxs', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_chunk': ('api/renderers.html#_get_chunk', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_chunks': ('api/renderers.html#_get_chunks', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_grid': ('api/renderers.html#_get_grid', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_n_channels': ('api/renderers.html#_get_n_channels', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_occupancy': ('api/renderers.html#_get_occupancy', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_overlaps': ('api/renderers.html#_get_overlaps', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_plane_intersections': ( 'api/renderers.html#_get_plane_intersections',
+                                                                                   'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_pyramid': ('api/renderers.html#_get_pyramid', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_pyramid_adjoint': ( 'api/renderers.html#_get_pyramid_adjoint',
+                                                                               'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_raw_volume': ('api/renderers.html#_get_raw_volume', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_shape': ('api/renderers.html#_get_shape', 'diffdrr/renderers.py'),
                                    'diffdrr.renderers._get_voxel': ('api/renderers.html#_get_voxel', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_voxel_idxs': ('api/renderers.html#_get_voxel_idxs', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._get_voxel_weights': ( 'api/renderers.html#_get_voxel_weights',
+                                                                             'diffdrr/renderers.py'),
                                    'diffdrr.renderers._get_xyzs': ('api/renderers.html#_get_xyzs', 'diffdrr/renderers.py'),
-                                   'diffdrr.renderers.reduce': ('api/renderers.html#reduce', 'diffdrr/renderers.py')},
+                                   'diffdrr.renderers._integrate': ('api/renderers.html#_integrate', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._merge_intersections': ( 'api/renderers.html#_merge_intersections',
+                                                                               'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._prepare_volume': ('api/renderers.html#_prepare_volume', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._project': ('api/renderers.html#_project', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers._put_voxel': ('api/renderers.html#_put_voxel', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.reduce': ('api/renderers.html#reduce', 'diffdrr/renderers.py'),
+                                   'diffdrr.renderers.reduce_channels': ('api/renderers.html#reduce_channels', 'diffdrr/renderers.py')},
             'diffdrr.utils': { 'diffdrr.utils.PinholeCamera': ('api/utils.html#pinholecamera', 'diffdrr/utils.py'),
                                'diffdrr.utils.PinholeCamera.__init__': ('api/utils.html#pinholecamera.__init__', 'diffdrr/utils.py'),
                                'diffdrr.utils.PinholeCamera.center': ('api/utils.html#pinholecamera.center', 'diffdrr/utils.py'),
@@ -3,12 +3,16 @@
 # %% ../notebooks/api/02_detector.ipynb 3
 from __future__ import annotations
 
+import math
+from functools import cache
+
 import torch
 from fastcore.basics import patch
 from torch.nn.functional import normalize
 
 # %% auto 0
-__all__ = ['Detector', 'get_focal_length', 'get_principal_point', 'parse_intrinsic_matrix', 'make_intrinsic_matrix']
+__all__ = ['Detector', 'PixelSampler', 'get_focal_length', 'get_principal_point', 'parse_intrinsic_matrix',
+           'make_intrinsic_matrix']
 
 # %% ../notebooks/api/02_detector.ipynb 5
 from .pose import RigidTransform
@@ -29,13 +33,15 @@ class Detector(torch.nn.Module):
         reorient: torch.Tensor,  # Frame-of-reference change matrix
         n_subsample: int | None = None,  # Number of target points to randomly sample
         reverse_x_axis: bool = False,  # If pose includes reflection (in E(3) not SE(3)), reverse x-axis
+        subsample_method: str = "uniform",  # Strategy for sampling target points, either "uniform", "stratified", "blue_noise", or "importance" (set the importance map with `set_importance_`)
+        resample: bool = False,  # If True, sample new target points every time the detector is called
     ):
         super().__init__()
         self.height = height
         self.width = width
         self.n_subsample = n_subsample
-        if self.n_subsample is not None:
-            self.subsamples = []
+        self.subsample_method = subsample_method
+        self.resample = resample
         self.reverse_x_axis = reverse_x_axis
 
         # Initialize the source and detector plane in default positions (along the x-axis)
@@ -43,6 +49,12 @@ class Detector(torch.nn.Module):
         self.register_buffer("source", source)
         self.register_buffer("target", target)
 
+        # Sample a fixed-size subset of the target points (resampling never rebuilds the detector plane)
+        if self.n_subsample is not None:
+            self.sampler = PixelSampler(
+                height, width, n_subsample, subsample_method, resample
+            )
+
         # Create a pose to reorient the scanner
         self.register_buffer("_reorient", reorient)
 
@@ -93,6 +105,24 @@ class Detector(torch.nn.Module):
         """The 3x3 intrinsic matrix."""
         return make_intrinsic_matrix(self).to(self.source)
 
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Older checkpoints of subsampled detectors store the sampled target points instead of the whole detector plane
+        target = state_dict.get(f"{prefix}target")
+        if (
+            self.n_subsample is not None
+            and target is not None
+            and target.shape[1] != self.target.shape[1]
+            and target.shape[1] == len(self.sampler.idxs)
+        ):
+            # Recover the sampled pixels from the rows and columns of the target points
+            grid = self.target[0]
+            step = grid[1, 0] - grid[0, 0] if self.width > 1 else 1.0
+            row = (grid[0, 1] - target[0, :, 1].to(grid)).round().long()
+            col = ((target[0, :, 0].to(grid) - grid[0, 0]) / step).round().long()
+            self.sampler.idxs.copy_(row * self.width + col)
+            state_dict[f"{prefix}target"] = self.target
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
 # %% ../notebooks/api/02_detector.ipynb 6
 @patch
 def _initialize_carm(self: Detector):
@@ -130,11 +160,6 @@ def _initialize_carm(self: Detector):
     # Add a batch dimension to the source and target so multiple poses can be passed at once
     source = source.unsqueeze(0)
     target = target.unsqueeze(0)
-
-    if self.n_subsample is not None:
-        sample = torch.randperm(self.height * self.width)[: int(self.n_subsample)]
-        target = target[:, sample, :]
-        self.subsamples.append(sample.tolist())
     return source, target
 
 # %% ../notebooks/api/02_detector.ipynb 7
@@ -142,18 +167,204 @@ from .pose import RigidTransform
 
 
 @patch
-def forward(self: Detector, extrinsic: RigidTransform, calibration: RigidTransform):
+def forward(
+    self: Detector,
+    extrinsic: RigidTransform,
+    calibration: RigidTransform,
+    roi: (
+        tuple | None
+    ) = None,  # Region of interest (row0, col0, height, width) to trace rays through
+    offset: (
+        tuple | None
+    ) = None,  # Subpixel offset (dx, dy) of the targets (in units pixels)
+    jitter: float = 0.0,  # Width of the square around the offset targets within which they are uniformly jittered (in units pixels)
+    resample: bool = True,  # If False, reuse the current subsample of target points even if the sampler resamples on every call
+):
     """Create source and target points for X-rays to trace through the volume."""
+    target = self.target
+    if roi is not None:
+        if self.n_subsample is not None:
+            raise ValueError(
+                "Cannot trace a region of interest of a subsampled detector"
+            )
+        target = target[0, _get_roi_idxs(roi, self.height, self.width, target.device)]
+    elif self.n_subsample is not None:
+        target = target[:, self.sampler() if resample else self.sampler.idxs]
+    if offset is not None:
+        # Before calibration, the target points are spaced one unit apart in the detector plane
+        offset = torch.tensor(offset).to(target)
+        if jitter > 0:
+            offset = offset + jitter * (torch.rand_like(target[..., :2]) - 0.5)
+        target = target + torch.nn.functional.pad(offset, (0, 1))
     if calibration is None:
-        target = self.calibration(self.target)
+        target = self.calibration(target)
     else:
-        target = calibration(self.target)
+        target = calibration(target)
     pose = self.reorient.compose(extrinsic)
     source = pose(self.source)
     target = pose(target)
     return source, target
 
+
+def _get_roi_idxs(roi, height, width, device):
+    """Indices of the pixels in a (batch of) regions of interest in the flattened detector plane."""
+    # The corners of the regions can vary across the batch, but their sizes cannot
+    row0, col0, h, w = roi
+    row0 = torch.as_tensor(row0, device=device).reshape(-1, 1, 1)
+    col0 = torch.as_tensor(col0, device=device).reshape(-1, 1, 1)
+    if (
+        (row0 < 0).any()
+        or (col0 < 0).any()
+        or (row0 + h > height).any()
+        or (col0 + w > width).any()
+    ):
+        raise ValueError(
+            f"Region of interest {roi} exceeds the {height}x{width} detector"
+        )
+    rows = row0 + torch.arange(h, device=device)[:, None]
+    cols = col0 + torch.arange(w, device=device)[None]
+    return (rows * width + cols).flatten(start_dim=1)
+
 # %% ../notebooks/api/02_detector.ipynb 9
+class PixelSampler(torch.nn.Module):
+    """Sample a fixed-size subset of the pixels in the detector plane."""
+
+    def __init__(
+        self,
+        height: int,  # Y-direction length (in units pixels)
+        width: int,  # X-direction length (in units pixels)
+        n_subsample: int,  # Number of pixels to sample
+        method: str = "uniform",  # Sampling strategy, either "uniform", "stratified", "blue_noise", or "importance"
+        resample: bool = False,  # If True, sample new pixels every time the sampler is called
+    ):
+        super().__init__()
+        if method not in ["uniform", "stratified", "blue_noise", "importance"]:
+            raise ValueError(
+                f"method must be 'uniform', 'stratified', 'blue_noise', or 'importance', not {method}"
+            )
+        self.height = height
+        self.width = width
+        self.method = method
+        self.resample = resample
+        n_subsample = max(1, min(int(n_subsample), height * width))
+
+        # The samples are redrawn when the sampler is created, so they are not saved in the state dict
+        self.register_buffer(
+            "idxs", torch.empty(n_subsample, dtype=torch.long), persistent=False
+        )
+        self.register_buffer(
+            "weights", torch.full([n_subsample], 1 / n_subsample), persistent=False
+        )
+        if method == "importance":
+            self.register_buffer(
+                "probs",
+                torch.full([height * width], 1 / (height * width)),
+                persistent=False,
+            )
+        self.resample_()
+
+    def forward(self):
+        """Indices of the sampled pixels in the flattened detector plane."""
+        if self.resample:
+            self.resample_()
+        return self.idxs
+
+    @torch.no_grad()
+    def resample_(self, generator: torch.Generator | None = None):
+        """Sample a new set of pixels (inplace)."""
+        device = self.idxs.device if generator is None else generator.device
+        n = len(self.idxs)
+        if self.method == "uniform":
+            idxs = torch.randperm(
+                self.height * self.width, generator=generator, device=device
+            )[:n]
+        elif self.method == "stratified":
+            idxs, weights = _stratified_sample(
+                self.height, self.width, n, generator, device
+            )
+            self.weights.copy_(weights)
+        elif self.method == "blue_noise":
+            idxs = _blue_noise_sample(self.height, self.width, n, generator, device)
+        else:
+            probs = self.probs.to(device)
+            idxs = torch.multinomial(probs, n, replacement=True, generator=generator)
+            self.weights.copy_(1 / (n * len(probs) * probs[idxs]))
+        return self.idxs.copy_(idxs)
+
+    @torch.no_grad()
+    def set_importance_(
+        self,
+        importance: torch.Tensor,  # Nonnegative importance of each pixel with shape (..., H, W)
+        uniform: float = 0.1,  # Proportion of the probability mass spread uniformly over the detector
+    ):
+        """Sample pixels proportionally to an importance map (inplace)."""
+        if self.method != "importance":
+            raise ValueError(f"Cannot set the importance of a {self.method} sampler")
+        importance = importance.reshape(-1, self.height * self.width).sum(dim=0)
+        total = importance.sum()
+        if total > 0:
+            importance = importance / total
+        else:
+            importance = torch.full_like(importance, 1 / len(importance))
+        self.probs.copy_((1 - uniform) * importance + uniform / len(importance))
+        return self.resample_()
+
+# %% ../notebooks/api/02_detector.ipynb 10
+def _stratified_sample(height, width, n, generator, device):
+    """Draw one pixel from each of `n` random cells in a partition of the detector and weight it by its cell's area."""
+    # Cells of this size tile the detector with at least n cells
+    size = max(1, math.floor(math.sqrt(height * width / n)))
+    n_cols = -(-width // size)
+    n_cells = -(-height // size) * n_cols
+    cells = torch.randperm(n_cells, generator=generator, device=device)[:n]
+
+    # Sample a pixel uniformly from each cell (cells on the border can be truncated)
+    y0 = (cells // n_cols) * size
+    x0 = (cells % n_cols) * size
+    h = (height - y0).clamp(max=size)
+    w = (width - x0).clamp(max=size)
+    u = torch.rand(2, n, generator=generator, device=device)
+    y = y0 + (u[0] * h).long()
+    x = x0 + (u[1] * w).long()
+
+    # A pixel is sampled with probability n / (n_cells * area of its cell)
+    weights = (h * w) * n_cells / (n * height * width)
+    return y * width + x, weights
+
+
+@cache
+def _blue_noise_mask(size: int = 64, sigma: float = 1.5):
+    """Rank the pixels of a tileable blue-noise mask by repeatedly filling its largest void."""
+    generator = torch.Generator().manual_seed(0)
+    dist = torch.arange(size)
+    dist = torch.minimum(dist, size - dist)
+    kernel = (-(dist[:, None] ** 2 + dist[None] ** 2) / (2 * sigma**2)).exp()
+
+    energy = torch.zeros(size, size)
+    ranks = torch.empty(size * size, dtype=torch.long)
+    idx = torch.randint(size * size, (1,), generator=generator).item()
+    for rank in range(size * size):
+        ranks[idx] = rank
+        energy += kernel.roll(divmod(idx, size), dims=(0, 1))
+        energy.view(-1)[idx] = torch.inf
+        idx = energy.argmin().item()
+    return ranks.view(size, size)
+
+
+def _blue_noise_sample(height, width, n, generator, device):
+    """Sample the `n` pixels with the lowest ranks in a randomly shifted tiling of a blue-noise mask."""
+    mask = _blue_noise_mask().to(device)
+    size = len(mask)
+    offset = torch.randint(size, (2,), generator=generator, device=device)
+    rows = (torch.arange(height, device=device) + offset[0]) % size
+    cols = (torch.arange(width, device=device) + offset[1]) % size
+    ranks = mask[rows[:, None], cols[None]].flatten()
+
+    # Break ties between the tiles at random
+    ranks = ranks + torch.rand(ranks.shape, generator=generator, device=device)
+    return ranks.topk(n, largest=False, sorted=False).indices
+
+# %% ../notebooks/api/02_detector.ipynb 12
 def get_focal_length(
     intrinsic,  # Intrinsic matrix (3 x 3 tensor)
     delx: float,  # X-direction spacing (in units length)
@@ -163,7 +374,7 @@ def get_focal_length(
     fy = intrinsic[1, 1]
     return abs((fx * delx) + (fy * dely)).item() / 2.0
 
-# %% ../notebooks/api/02_detector.ipynb 10
+# %% ../notebooks/api/02_detector.ipynb 13
 def get_principal_point(
     intrinsic,  # Intrinsic matrix (3 x 3 tensor)
     height: int,  # Y-direction length (in units pixels)
@@ -175,7 +386,7 @@ def get_principal_point(
     y0 = dely * (intrinsic[1, 2] - height / 2)
     return x0.item(), y0.item()
 
-# %% ../notebooks/api/02_detector.ipynb 11
+# %% ../notebooks/api/02_detector.ipynb 14
 def parse_intrinsic_matrix(
     intrinsic,  # Intrinsic matrix (3 x 3 tensor)
     height: int,  # Y-direction length (in units pixels)
@@ -187,16 +398,22 @@ def parse_intrinsic_matrix(
     x0, y0 = get_principal_point(intrinsic, height, width, delx, dely)
     return focal_length, x0, y0
 
-# %% ../notebooks/api/02_detector.ipynb 12
+# %% ../notebooks/api/02_detector.ipynb 15
 def make_intrinsic_matrix(detector: Detector):
-    fx = detector.sdd / detector.delx
-    fy = detector.sdd / detector.dely
-    u0 = detector.x0 / detector.delx + detector.width / 2
-    v0 = detector.y0 / detector.dely + detector.height / 2
-    return torch.tensor(
+    # Read the intrinsic parameters from the calibration matrix without syncing with the device
+    calibration = detector._calibration
+    sdd, delx, dely = calibration[2, 2], calibration[0, 0], calibration[1, 1]
+    x0, y0 = -calibration[0, -1], -calibration[1, -1]
+
+    fx = sdd / delx
+    fy = sdd / dely
+    u0 = x0 / delx + detector.width / 2
+    v0 = y0 / dely + detector.height / 2
+    zero, one = torch.zeros_like(sdd), torch.ones_like(sdd)
+    return torch.stack(
         [
-            [fx, 0.0, u0],
-            [0.0, fy, v0],
-            [0.0, 0.0, 1.0],
+            torch.stack([fx, zero, u0]),
+            torch.stack([zero, fy, v0]),
+            torch.stack([zero, zero, one]),
         ]
     )
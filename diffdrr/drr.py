@@ -9,12 +9,14 @@ import torch.nn as nn
 from fastcore.basics import patch
 
 from .detector import Detector
-from .renderers import Siddon, Trilinear
+from .renderers import DistanceDriven, Siddon, Trilinear
 
 # %% auto 0
-__all__ = ['DRR']
+__all__ = ['DRR', 'SystemMatrix']
 
 # %% ../notebooks/api/00_drr.ipynb 7
+from collections import OrderedDict
+
 from torchio import Subject
 
 from .pose import RigidTransform
@@ -25,7 +27,9 @@ class DRR(nn.Module):
 
     def __init__(
         self,
-        subject: Subject,  # TorchIO wrapper for the CT volume
+        subject: (
+            Subject | list[Subject]
+        ),  # TorchIO wrapper for the CT volume (or a list of subjects to render as a batch)
         sdd: float,  # Source-to-detector distance (i.e., the C-arm's focal length)
         height: int,  # Height of the rendered DRR
         delx: float,  # X-axis pixel size
@@ -34,15 +38,42 @@ class DRR(nn.Module):
         x0: float = 0.0,  # Principal point X-offset
         y0: float = 0.0,  # Principal point Y-offset
         p_subsample: float | None = None,  # Proportion of pixels to randomly subsample
+        subsample_method: str = "uniform",  # Strategy for subsampling pixels, either "uniform", "stratified", "blue_noise", or "importance" (set the importance map with `set_importance_`)
+        resample: bool = False,  # If True, subsample new pixels every time a DRR is rendered
         reshape: bool = True,  # Return DRR with shape (b, 1, h, w)
+        supersample: int = 1,  # Average a k x k grid of subpixel rays in every pixel to anti-alias the DRR
+        jitter: bool = False,  # If True, randomly jitter the subpixel rays within their cells on every render
         reverse_x_axis: bool = True,  # If True, obey radiologic convention (e.g., heart on right)
         patch_size: int | None = None,  # Render patches of the DRR in series
-        renderer: str = "siddon",  # Rendering backend, either "siddon" or "trilinear"
+        max_rays_per_chunk: (
+            int | None
+        ) = None,  # Render chunks of at most this many rays in series
+        max_memory: (
+            float | None
+        ) = None,  # Memory budget (in GB) for rendering each chunk of rays
+        checkpoint: bool = False,  # Recompute each chunk of rays in the backward pass instead of storing them
+        n_workers: int = 1,  # Render patches (or chunks of rays) in parallel with a pool of this many threads
+        threads_per_worker: (
+            int | None
+        ) = None,  # Intra-op threads used by each worker (default to splitting `torch.get_num_threads()` between them)
+        skip_empty_space: bool = True,  # Skip the empty space at the start and end of each ray
+        pyramid_levels: int = 1,  # Number of levels in the volume's pyramid (1 always renders at full resolution)
+        isocenter_distance: (
+            float | None
+        ) = None,  # Nominal source-to-isocenter distance used to pick the level of the pyramid (default to `sdd / 2`)
+        renderer: str = "siddon",  # Rendering backend, either "siddon", "trilinear", or "distance_driven"
         persistent: bool = True,  # Set persistent value in `torch.nn.Module.register_buffer`
         **renderer_kwargs,  # Kwargs for the renderer
     ):
         super().__init__()
 
+        # A list of subjects is rendered as a batch of volumes, one for each pose
+        subjects = list(subject) if isinstance(subject, (list, tuple)) else [subject]
+        if len(subjects) > 1:
+            reorient = torch.stack([s.reorient for s in subjects])
+        else:
+            reorient = subjects[0].reorient
+
         # Initialize the X-ray detector
         width = height if width is None else width
         dely = delx if dely is None else dely
@@ -58,16 +89,23 @@ class DRR(nn.Module):
             dely,
             x0,
             y0,
-            subject.reorient,
+            reorient,
             reverse_x_axis=reverse_x_axis,
             n_subsample=n_subsample,
+            subsample_method=subsample_method,
+            resample=resample,
         )
 
         # Initialize the volume and world geometry
         self.subject = subject
         self.register_buffer(
             "_affine",
-            torch.as_tensor(subject.volume.affine, dtype=torch.float32).unsqueeze(0),
+            torch.stack(
+                [
+                    torch.as_tensor(s.volume.affine, dtype=torch.float32)
+                    for s in subjects
+                ]
+            ),
             persistent=persistent,
         )  # Using float64 can sometimes improve rendering quality (https://github.com/eigenvivek/DiffDRR/issues/202)
         self.register_buffer(
@@ -77,31 +115,62 @@ class DRR(nn.Module):
         )
         self.register_buffer(
             "density",
-            subject.density.data.squeeze(),
+            _stack_volumes([s.density.data.squeeze() for s in subjects]),
             persistent=persistent,
         )
-        if subject.mask is not None:
+        if all(s.mask is not None for s in subjects):
             self.register_buffer(
                 "mask",
-                subject.mask.data.to(torch.float32).squeeze(),
+                _stack_volumes(
+                    [s.mask.data.to(torch.float32).squeeze() for s in subjects]
+                ),
                 persistent=persistent,
             )
+            self.n_channels = int(self.mask.max().item() + 1)
 
         # Initialize the renderer
         if renderer == "siddon":
             self.renderer = Siddon(**renderer_kwargs)
         elif renderer == "trilinear":
             self.renderer = Trilinear(**renderer_kwargs)
+        elif renderer == "distance_driven":
+            self.renderer = DistanceDriven(**renderer_kwargs)
         else:
             raise ValueError(
-                f"renderer must be 'siddon' or 'trilinear', not {renderer}"
+                f"renderer must be 'siddon', 'trilinear', or 'distance_driven', not {renderer}"
             )
         self.reshape = reshape
+        self.supersample = supersample
+        self.jitter = jitter
         self.patch_size = patch_size
-
-    def reshape_transform(self, img, batch_size):
+        self.max_rays_per_chunk = max_rays_per_chunk
+        self.max_memory = max_memory
+        self.checkpoint = checkpoint
+        self.n_workers = n_workers
+        self.threads_per_worker = threads_per_worker
+        self.skip_empty_space = skip_empty_space
+        self.pyramid_levels = pyramid_levels
+        self.isocenter_distance = isocenter_distance
+        self._level = self.level_of_detail()
+
+        # Cache quantities derived from the volumes (e.g., copies in the layout sampled by the renderer)
+        self._cache = {}
+
+        # Cache the most recently used detectors so switching between resolutions does not rebuild them
+        self._detectors = OrderedDict()
+        self.max_cached_detectors = 8
+
+    def __getstate__(self):
+        # The cache holds weak references to the volumes, which cannot be pickled, so it is rebuilt after unpickling
+        state = self.__dict__.copy()
+        state["_cache"] = {}
+        return state
+
+    def reshape_transform(self, img, batch_size, roi=None):
         if self.reshape:
-            if self.detector.n_subsample is None:
+            if roi is not None:
+                img = img.view(batch_size, -1, roi[2], roi[3])
+            elif self.detector.n_subsample is None:
                 img = img.view(
                     batch_size,
                     -1,
@@ -120,9 +189,24 @@ class DRR(nn.Module):
     def affine_inverse(self):
         return RigidTransform(self._affine_inverse)
 
-    @property
-    def n_patches(self):
-        return (self.detector.height * self.detector.width) // (self.patch_size**2)
+    def chunk_size(self, density, batch_size, n_rays, **kwargs):
+        """Number of rays to render at once."""
+        # Voxel-driven renderers project the whole volume for every chunk, so their rays are never chunked
+        if getattr(self.renderer, "voxel_driven", False):
+            return n_rays
+        if self.patch_size is not None:
+            return self.patch_size**2
+        chunk_size = n_rays
+        if self.max_rays_per_chunk is not None:
+            chunk_size = min(chunk_size, self.max_rays_per_chunk)
+        if self.max_memory is not None:
+            memory_per_ray = batch_size * self.renderer.memory_per_ray(
+                density, **kwargs
+            )
+            chunk_size = min(
+                chunk_size, max(1, int(self.max_memory * 2**30 // memory_per_ray))
+            )
+        return chunk_size
 
     @property
     def device(self):
@@ -133,15 +217,47 @@ class DRR(nn.Module):
         return self.density.dtype
 
 # %% ../notebooks/api/00_drr.ipynb 8
+from torch.nn.functional import pad
+
+
+def _stack_volumes(volumes: list[torch.Tensor]):
+    """Pad (X, Y, Z) volumes with empty space to a common shape and stack them into a (B, X, Y, Z) batch."""
+    if len(volumes) == 1:
+        return volumes[0]
+
+    # Pad the end of each axis so the voxel coordinates of every volume (i.e., its affine) are unchanged
+    shape = torch.tensor([volume.shape for volume in volumes]).amax(dim=0)
+    return torch.stack(
+        [
+            pad(
+                volume,
+                [
+                    p
+                    for n, m in zip(shape.flip(0), volume.shape[::-1])
+                    for p in (0, n - m)
+                ],
+            )
+            for volume in volumes
+        ]
+    )
+
+
 def reshape_subsampled_drr(img: torch.Tensor, detector: Detector, batch_size: int):
+    # Clone the indices so resampling before the backward pass does not modify them
     n_points = detector.height * detector.width
-    drr = torch.zeros(batch_size, n_points).to(img)
-    drr[:, detector.subsamples[-1]] = img
-    drr = drr.view(batch_size, 1, detector.height, detector.width)
-    return drr
+    drr = img.new_zeros(*img.shape[:-1], n_points)
+    drr = drr.index_copy(-1, detector.sampler.idxs.clone(), img)
+    return drr.view(batch_size, -1, detector.height, detector.width)
 
 # %% ../notebooks/api/00_drr.ipynb 10
+import math
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from torch.utils.checkpoint import checkpoint
+
 from .pose import RigidTransform, convert
+from .renderers import _get_chunk, _get_chunks, _get_occupancy, _get_pyramid, _get_pyramid_adjoint, _get_raw_volume, _get_voxel, _get_voxel_weights, _LinearRender, _prepare_volume  # fmt: skip
 
 
 @patch
@@ -152,6 +268,12 @@ def forward(
     convention: str = None,  # If parameterization is Euler angles, specify convention
     calibration: RigidTransform = None,  # Optional calibration matrix with the detector's intrinsic parameters
     mask_to_channels: bool = False,  # If True, structures from the CT mask are rendered in separate channels
+    roi: (
+        tuple | None
+    ) = None,  # Only render the region of interest (row0, col0, height, width) of the detector
+    scales: (
+        list[float] | None
+    ) = None,  # Return a list of DRRs rendered at these scales of the detector's resolution
     **kwargs,  # Passed to the renderer
 ):
     """Generate DRR with rotational and translational parameters."""
@@ -160,11 +282,53 @@ def forward(
         pose = args[0]
     else:
         pose = convert(*args, parameterization=parameterization, convention=convention)
+    self._check_batch_size(pose)
+    if scales is not None:
+        if roi is not None:
+            raise ValueError("Cannot render a region of interest at multiple scales")
+        return self.render_scales(pose, scales, calibration, mask_to_channels, **kwargs)
 
     # Create the source / target points and render the image
-    source, target = self.detector(pose, calibration)
-    img = self.render(self.density, source, target, mask_to_channels, **kwargs)
-    return self.reshape_transform(img, batch_size=len(pose))
+    if self.supersample > 1 or self.jitter:
+        img = self.render_supersampled(
+            pose, calibration, mask_to_channels, roi, **kwargs
+        )
+    else:
+        source, target = self.detector(pose, calibration, roi)
+        img = self.render(self.density, source, target, mask_to_channels, **kwargs)
+    return self.reshape_transform(img, batch_size=len(img), roi=roi)
+
+
+@patch
+def render_supersampled(
+    self: DRR,
+    pose: RigidTransform,  # Camera poses
+    calibration: RigidTransform = None,  # Optional calibration matrix with the detector's intrinsic parameters
+    mask_to_channels: bool = False,  # If True, structures from the CT mask are rendered in separate channels
+    roi: (
+        tuple | None
+    ) = None,  # Only render the region of interest (row0, col0, height, width) of the detector
+    **kwargs,  # Passed to the renderer
+):
+    """Box-filter every pixel by averaging the rays cast through a k x k grid of (jittered) subpixels."""
+    # The subpixels are rendered one cell at a time and accumulated, so an image at the supersampled resolution is never stored
+    # Every subpixel is cast through the same subsample of pixels, which is drawn once per render
+    if self.detector.n_subsample is not None and roi is None:
+        self.detector.sampler()
+
+    k = self.supersample
+    img = 0
+    for row in range(k):
+        for col in range(k):
+            offset = ((col + 0.5) / k - 0.5, (row + 0.5) / k - 0.5)
+            jitter = 1 / k if self.jitter else 0.0
+            source, target = self.detector(
+                pose, calibration, roi, offset, jitter, resample=False
+            )
+            img = img + self.render(
+                self.density, source, target, mask_to_channels, **kwargs
+            )
+    return img / k**2
 
 
 @patch
@@ -179,14 +343,34 @@ def render(
     # Initialize the image with the length of each cast ray
     img = (target - source).norm(dim=-1).unsqueeze(1)
 
-    # Convert rays to voxelspace
-    source = self.affine_inverse(source)
-    target = self.affine_inverse(target)
+    # Pick the level of the volume's pyramid to render from (volumes being optimized are rendered at full resolution)
+    level = 0 if density.requires_grad else self._level
+
+    # Convert rays to voxelspace (voxel coordinates are halved at each level of the pyramid)
+    source = self.affine_inverse(source) / 2**level
+    target = self.affine_inverse(target) / 2**level
 
     # Render the image
-    kwargs["mask"] = self.mask if mask_to_channels else None
-    if self.patch_size is None:
-        img = self.renderer(
+    if self.skip_empty_space:
+        kwargs["occupancy"] = self.occupancy(density, level)
+    density = self.sampling_volume("density", density, level)
+    if mask_to_channels:
+        kwargs["mask"] = self.sampling_volume("mask", self.mask, level)
+        kwargs["n_channels"] = self.n_channels
+    else:
+        kwargs["mask"] = None
+    renderer = self.renderer
+    if self.differentiate_by_backprojection(density, source, target):
+        renderer = lambda *args, **kwargs: _LinearRender.apply(
+            self.renderer, kwargs, *args
+        )
+    n_rays = target.shape[1]
+    chunk_size = self.chunk_size(density, len(target), n_rays, **kwargs)
+    if self.n_workers > 1 and not getattr(self.renderer, "voxel_driven", False):
+        # Split the rays so every worker has a chunk to render
+        chunk_size = min(chunk_size, -(-n_rays // self.n_workers))
+    if chunk_size >= n_rays:
+        img = renderer(
             density,
             source,
             target,
@@ -194,22 +378,421 @@ def render(
             **kwargs,
         )
     else:
-        n_points = target.shape[1] // self.n_patches
-        partials = []
-        for idx in range(self.n_patches):
-            partial = self.renderer(
-                density,
-                source,
-                target[:, idx * n_points : (idx + 1) * n_points],
-                img[..., idx * n_points : (idx + 1) * n_points],
-                **kwargs,
-            )
-            partials.append(partial)
+
+        def render_chunk(chunk):
+            args = (density, *_get_chunk(source, target, img, chunk))
+            if self.checkpoint and torch.is_grad_enabled():
+                return checkpoint(renderer, *args, use_reentrant=False, **kwargs)
+            return renderer(*args, **kwargs)
+
+        partials = self.map_chunks(render_chunk, _get_chunks(n_rays, chunk_size))
         img = torch.cat(partials, dim=-1)
 
     return img
 
-# %% ../notebooks/api/00_drr.ipynb 11
+
+@patch
+def map_chunks(
+    self: DRR,
+    fn,  # Function applied to every chunk of rays
+    chunks: list,  # Chunks of rays
+):
+    """Apply a function to every chunk of rays, dispatching them to a pool of `n_workers` threads."""
+    if self.n_workers <= 1 or len(chunks) <= 1 or torch.compiler.is_compiling():
+        return [fn(chunk) for chunk in chunks]
+
+    # Limit the intra-op parallelism of each worker so the workers do not oversubscribe the cores
+    n_threads = torch.get_num_threads()
+    threads_per_worker = self.threads_per_worker or max(1, n_threads // self.n_workers)
+    grad_enabled = torch.is_grad_enabled()
+
+    def initializer():
+        torch.set_num_threads(threads_per_worker)
+        torch.set_grad_enabled(grad_enabled)  # Grad mode is thread-local
+
+    try:
+        with ThreadPoolExecutor(self.n_workers, initializer=initializer) as pool:
+            return list(pool.map(fn, chunks))
+    finally:
+        # Setting the number of threads in a worker also changes the default for new threads
+        torch.set_num_threads(n_threads)
+
+
+@patch
+def differentiate_by_backprojection(
+    self: DRR,
+    density: torch.Tensor,  # Volume from which to render DRRs
+    source: torch.Tensor,  # Voxel coordinates of X-ray source
+    target: torch.Tensor,  # Voxel coordinates of X-ray target
+):
+    """Check if the gradient of the density can be computed by backprojection instead of autograd."""
+    # This is only possible if the rendered image is linear in the density and the pose is not being optimized
+    # Memory-efficient renderers are left to recompute their samples in the backward pass instead of storing them
+    return (
+        density.requires_grad
+        and not (source.requires_grad or target.requires_grad)
+        and hasattr(self.renderer, "backproject")
+        and self.renderer.reducefn == "sum"
+        and not getattr(self.renderer, "stop_gradients_through_grid_sample", False)
+        and not getattr(self.renderer, "memory_efficient", False)
+        and not torch.compiler.is_compiling()
+    )
+
+
+@patch
+def backproject(
+    self: DRR,
+    img: torch.Tensor,  # Image to backproject with shape (B, C, H, W) or (B, C, n_rays)
+    *args,  # Some batched representation of SE(3)
+    parameterization: str = None,  # Specifies the representation of the rotation
+    convention: str = None,  # If parameterization is Euler angles, specify convention
+    calibration: RigidTransform = None,  # Optional calibration matrix with the detector's intrinsic parameters
+    mask_to_channels: bool = False,  # If True, each channel is backprojected onto the structure with the same label in the CT mask
+    roi: (
+        tuple | None
+    ) = None,  # Region of interest (row0, col0, height, width) of the detector that the image covers
+    **kwargs,  # Passed to the renderer
+):
+    """Backproject images along the rays cast from the camera poses (i.e., the adjoint of `forward` with respect to the density).
+
+    The adjoint is not defined for jittered subpixels since they are redrawn every time `forward` is called.
+    """
+    # Initialize the camera pose
+    if parameterization is None:
+        pose = args[0]
+    else:
+        pose = convert(*args, parameterization=parameterization, convention=convention)
+    self._check_batch_size(pose)
+    if self.jitter:
+        raise ValueError("Cannot backproject with jittered subpixels")
+
+    # Get the image's value along each ray (drawing the subsample of pixels once, as in `forward`)
+    if self.detector.n_subsample is not None and roi is None:
+        self.detector.sampler()
+    if img.dim() == 4:
+        img = img.flatten(start_dim=2)
+        if self.detector.n_subsample is not None:
+            img = img[..., self.detector.sampler.idxs]
+
+    # Since `forward` averages the rays cast through a k x k grid of subpixels, its adjoint averages their backprojections
+    k = self.supersample
+    offsets = [None]
+    if k > 1:
+        offsets = [
+            ((col + 0.5) / k - 0.5, (row + 0.5) / k - 0.5)
+            for row in range(k)
+            for col in range(k)
+        ]
+    img = img / k**2
+
+    # Backproject the image onto the level of the density's pyramid used by `forward`
+    # Empty space is not skipped since the adjoint is nonzero everywhere along each ray
+    level = self._level
+    with torch.no_grad():
+        density = self.sampling_volume("density", self.density, level)
+    if mask_to_channels:
+        kwargs["mask"] = self.sampling_volume("mask", self.mask, level)
+        kwargs["n_channels"] = self.n_channels
+    volume = 0
+    for offset in offsets:
+        # Create the source / target points and convert them to voxelspace at the level of the pyramid
+        source, target = self.detector(pose, calibration, roi, offset, resample=False)
+        weights = img * (target - source).norm(dim=-1).unsqueeze(1)
+        source = self.affine_inverse(source) / 2**level
+        target = self.affine_inverse(target) / 2**level
+
+        n_rays = target.shape[1]
+        chunk_size = self.chunk_size(density, len(target), n_rays, **kwargs)
+        for chunk in _get_chunks(n_rays, min(chunk_size, n_rays)):
+            args = (density, *_get_chunk(source, target, weights, chunk))
+            if hasattr(self.renderer, "backproject"):
+                volume = volume + self.renderer.backproject(*args, **kwargs)
+            else:
+                # Otherwise, use the vector-Jacobian product of the renderer
+                with torch.enable_grad():
+                    zeros = torch.zeros_like(density, requires_grad=True)
+                    partial = self.renderer(zeros, *args[1:3], None, **kwargs)
+                    volume = volume + torch.autograd.grad(partial, zeros, args[3])[0]
+
+    # Spread the backprojection onto the full-resolution density (i.e., the adjoint of downsampling it)
+    volume = _get_pyramid_adjoint(volume, _prepare_volume(self.density).shape, level)
+    return _get_raw_volume(volume)
+
+
+@patch
+def sampling_volume(
+    self: DRR,
+    name: str,  # Key for the cached volume (e.g., "density" or "mask")
+    volume: torch.Tensor,  # Volume with shape (X, Y, Z) or (B, X, Y, Z)
+    level: int = 0,  # Level of the volume's pyramid
+):
+    """Get a contiguous copy of a volume in the layout sampled by the renderer."""
+    # Volumes being optimized are copied on every call so gradients can flow through them
+    if volume.requires_grad:
+        return _prepare_volume(volume).contiguous()
+
+    # Coarser levels are downsampled from the volume the first time they are needed
+    if level > 0:
+        return self.pyramid(name, volume)[level - 1]
+
+    # Otherwise, the copy is cached until the volume is replaced or modified in place
+    return self._cached(
+        f"{name}/sampling_volume", volume, lambda x: _prepare_volume(x).contiguous()
+    )
+
+
+@patch
+def occupancy(
+    self: DRR,
+    volume: torch.Tensor,  # Volume with shape (X, Y, Z) or (B, X, Y, Z)
+    level: int = 0,  # Level of the volume's pyramid
+):
+    """Get the bounding box and the grid of bricks that summarize the nonzero region of a volume."""
+    # Empty space cannot be skipped in volumes being optimized since their nonzero region can change
+    # Computing the occupancy is also skipped when compiling since its shape depends on the data
+    if volume.requires_grad or torch.compiler.is_compiling():
+        return None
+    if level > 0:
+        return self._cached(
+            f"density/occupancy/{level}",
+            volume,
+            lambda x: _get_occupancy(self.pyramid("density", x)[level - 1]),
+        )
+    return self._cached("density/occupancy", volume, _get_occupancy)
+
+
+@patch
+def pyramid(
+    self: DRR,
+    name: str,  # Key for the cached volume (e.g., "density" or "mask")
+    volume: torch.Tensor,  # Volume with shape (X, Y, Z) or (B, X, Y, Z)
+):
+    """Get the coarser levels of the volume's mip-style pyramid in the layout sampled by the renderer."""
+    return self._cached(
+        f"{name}/pyramid",
+        volume,
+        lambda x: _get_pyramid(x, self.pyramid_levels, labels=name == "mask"),
+    )
+
+
+@patch
+def level_of_detail(self: DRR):
+    """Get the coarsest level of the volume's pyramid whose voxels are no larger than a detector pixel (or subpixel) projected to the nominal isocenter."""
+    if self.pyramid_levels <= 1:
+        return 0
+
+    # The level only depends on the detector's intrinsics (not the poses), so every pose in a batch
+    # is rendered from the same level and the rendered image is continuous in the pose
+    sdd = self.detector.sdd
+    isocenter_distance = self.isocenter_distance or sdd / 2
+    footprint = (
+        min(self.detector.delx, self.detector.dely)
+        * isocenter_distance
+        / sdd
+        / self.supersample
+    )
+
+    # Compare the footprint to the smallest voxel spacing
+    spacing = self._affine[:, :3, :3].norm(dim=-2).min().item()
+    level = math.floor(math.log2(footprint / spacing))
+    return min(max(level, 0), self.pyramid_levels - 1)
+
+
+@patch
+def _cached(self: DRR, name: str, volume: torch.Tensor, fn):
+    """Cache `fn(volume)` until the volume is replaced or modified in place.
+
+    In-place writes through `volume.data` are not tracked by the version counter, so the volume should be reassigned instead.
+    """
+    if torch.compiler.is_compiling():
+        return fn(volume)
+
+    # The source is compared by identity (through a weak reference), so a new volume allocated at the address of a freed one is never mistaken for it
+    key = (
+        volume.data_ptr(),
+        volume._version,
+        volume.shape,
+        volume.dtype,
+        volume.device,
+    )
+    cached = self._cache.get(name)
+    if cached is None or cached[0]() is not volume or cached[1] != key:
+        self._cache[name] = (weakref.ref(volume), key, fn(volume))
+    return self._cache[name][2]
+
+
+@patch
+def _check_batch_size(self: DRR, pose: RigidTransform):
+    """Check that a batch of volumes is rendered from a single pose or one pose per volume."""
+    if self.density.dim() == 4 and len(pose) not in (1, len(self.density)):
+        raise ValueError(
+            f"Cannot render {len(pose)} poses from a batch of {len(self.density)} volumes (pass a single pose or one pose per volume)"
+        )
+
+# %% ../notebooks/api/00_drr.ipynb 12
+class SystemMatrix(nn.Module):
+    """Sparse CSR matrix that renders the DRRs of a volume from a fixed set of camera poses."""
+
+    def __init__(
+        self,
+        matrix: torch.Tensor,  # Sparse CSR matrix with shape (B * C * n_rays, X * Y * Z)
+        shape: tuple,  # Shape of the rendered DRRs, (B, C, n_rays)
+        volume_shape: tuple,  # Shape of the volume, (X, Y, Z)
+    ):
+        super().__init__()
+        self.register_buffer("matrix", matrix)
+        self.register_buffer("matrix_t", None, persistent=False)
+        self.shape = tuple(shape)
+        self.volume_shape = tuple(volume_shape)
+
+    def forward(
+        self,
+        density: torch.Tensor,  # Volume with shape (X, Y, Z)
+    ):
+        """Render the DRRs of a volume."""
+        density = density.reshape(-1, 1).to(self.matrix.dtype)
+        return _SparseRender.apply(self, density).view(self.shape)
+
+    def backproject(
+        self,
+        img: torch.Tensor,  # DRRs with shape (B, C, n_rays)
+    ):
+        """Backproject DRRs onto the volume (i.e., multiply by the transpose of the system matrix)."""
+        volume = self.transpose() @ img.reshape(-1, 1).to(self.matrix.dtype)
+        return volume.view(self.volume_shape)
+
+    def transpose(self):
+        """Get the transpose of the system matrix in CSR format (computed the first time it is needed)."""
+        # Multiplying by the transpose of a CSR matrix directly is much slower than with a CSR transpose
+        if self.matrix_t is None:
+            self.matrix_t = self.matrix.t().to_sparse_csr()
+        return self.matrix_t
+
+    def save(self, path: str):
+        """Save the system matrix to an uncompressed .npz file."""
+        matrix = self.matrix.cpu()
+        np.savez(
+            path,
+            crow_indices=matrix.crow_indices().numpy(),
+            col_indices=matrix.col_indices().numpy(),
+            values=matrix.values().numpy(),
+            shape=np.array(self.shape),
+            volume_shape=np.array(self.volume_shape),
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        """Load a system matrix saved with `SystemMatrix.save`."""
+        with np.load(path) as data:
+            shape = tuple(data["shape"].tolist())
+            volume_shape = tuple(data["volume_shape"].tolist())
+            matrix = torch.sparse_csr_tensor(
+                torch.from_numpy(data["crow_indices"]),
+                torch.from_numpy(data["col_indices"]),
+                torch.from_numpy(data["values"]),
+                size=(int(np.prod(shape)), int(np.prod(volume_shape))),
+            )
+        return cls(matrix, shape, volume_shape)
+
+
+class _SparseRender(torch.autograd.Function):
+    """Multiply by the system matrix, computing the gradient of the volume with its CSR transpose."""
+
+    @staticmethod
+    def forward(ctx, system_matrix, density):
+        ctx.system_matrix = system_matrix
+        return system_matrix.matrix @ density
+
+    @staticmethod
+    def backward(ctx, grad):
+        return None, ctx.system_matrix.transpose() @ grad
+
+
+@patch
+def system_matrix(
+    self: DRR,
+    *args,  # Some batched representation of SE(3)
+    parameterization: str = None,  # Specifies the representation of the rotation
+    convention: str = None,  # If parameterization is Euler angles, specify convention
+    calibration: RigidTransform = None,  # Optional calibration matrix with the detector's intrinsic parameters
+    mask_to_channels: bool = False,  # If True, structures from the CT mask are rendered in separate channels
+    **kwargs,  # Passed to the renderer
+):
+    """Trace the rays cast from a fixed set of camera poses into a sparse system matrix."""
+    if not hasattr(self.renderer, "samples"):
+        raise ValueError(
+            f"{type(self.renderer).__name__} does not support computing a system matrix"
+        )
+    if self.density.dim() != 3:
+        raise ValueError("Cannot compute a system matrix for a batch of volumes")
+
+    # Initialize the camera pose
+    if parameterization is None:
+        pose = args[0]
+    else:
+        pose = convert(*args, parameterization=parameterization, convention=convention)
+
+    # Create the source / target points and convert them to voxelspace
+    source, target = self.detector(pose, calibration)
+    img = (target - source).norm(dim=-1).unsqueeze(1)
+    source = self.affine_inverse(source)
+    target = self.affine_inverse(target)
+
+    # Trace the rays through the full-resolution volume in chunks (skipping the same empty space as `forward`)
+    if self.skip_empty_space:
+        kwargs["occupancy"] = self.occupancy(self.density)
+    with torch.no_grad():
+        density = self.sampling_volume("density", self.density)
+    mask = self.sampling_volume("mask", self.mask) if mask_to_channels else None
+    X, Y, Z = self.density.shape
+    B, n_rays = target.shape[:2]
+    C = self.n_channels if mask_to_channels else 1
+    chunk_size = self.chunk_size(density, B, n_rays, **kwargs)
+    rows, cols, values = [], [], []
+    align_corners = kwargs.get("align_corners", False)
+    for chunk in _get_chunks(n_rays, min(chunk_size, n_rays)):
+        xyzs, weights = self.renderer.samples(
+            density, *_get_chunk(source, target, img, chunk)[:2], **kwargs
+        )
+        idxs, weights = _get_voxel_weights(
+            density, xyzs, weights, self.renderer.mode, align_corners
+        )
+        weights = weights * img[..., chunk].transpose(-1, -2)
+
+        # Get the channel of each sample from the label of the CT mask at the sample
+        channels = 0
+        if mask_to_channels:
+            channels = _get_voxel(mask, xyzs, None, self.renderer.mode, align_corners)
+            channels = channels.long().repeat_interleave(
+                idxs.shape[-1] // channels.shape[-1], dim=-1
+            )
+
+        # Keep the voxels that contribute to each ray
+        valid = (idxs >= 0) & (weights != 0)
+        batch, ray, _ = valid.nonzero(as_tuple=True)
+        idxs, weights = idxs[valid].long(), weights[valid]
+        if mask_to_channels:
+            channels = channels[valid]
+
+        # Convert the voxel indices from the (Z, Y, X) layout to the (X, Y, Z) layout of the density
+        x, y, z = idxs % X, (idxs // X) % Y, idxs // (X * Y)
+        idxs = (x * Y + y) * Z + z
+
+        # Rays are ordered as the flattened DRRs (B, C, n_rays)
+        rows.append((batch * C + channels) * n_rays + ray + chunk.start)
+        cols.append(idxs)
+        values.append(weights)
+
+    # Sum the contributions of voxels sampled multiple times along the same ray
+    matrix = torch.sparse_coo_tensor(
+        torch.stack([torch.cat(rows), torch.cat(cols)]),
+        torch.cat(values),
+        size=(B * C * n_rays, X * Y * Z),
+    )
+    matrix = matrix.coalesce().to_sparse_csr()
+    return SystemMatrix(matrix, (B, C, n_rays), (X, Y, Z))
+
+# %% ../notebooks/api/00_drr.ipynb 13
 @patch
 def set_intrinsics_(
     self: DRR,
@@ -222,9 +805,11 @@ def set_intrinsics_(
     y0: float = None,
     n_subsample: int = None,
     reverse_x_axis: bool = None,
+    subsample_method: str = None,
+    resample: bool = None,
 ):
     """Set new intrinsic parameters (inplace)."""
-    self.detector = Detector(
+    intrinsics = (
         sdd if sdd is not None else self.detector.sdd,
         height if height is not None else self.detector.height,
         width if width is not None else self.detector.width,
@@ -232,12 +817,47 @@ def set_intrinsics_(
         dely if dely is not None else self.detector.dely,
         x0 if x0 is not None else -self.detector.x0,
         y0 if y0 is not None else -self.detector.y0,
-        self.subject.reorient,
         n_subsample if n_subsample is not None else self.detector.n_subsample,
         reverse_x_axis if reverse_x_axis is not None else self.detector.reverse_x_axis,
-    ).to(self.density)
+        (
+            subsample_method
+            if subsample_method is not None
+            else self.detector.subsample_method
+        ),
+        resample if resample is not None else self.detector.resample,
+    )
 
-# %% ../notebooks/api/00_drr.ipynb 12
+    # Reuse the detector with the same intrinsics if it was used recently (it may have been moved since)
+    self._detectors[_detector_key(self.detector)] = self.detector
+    detector = self._detectors.pop(_detector_key(intrinsics), None)
+    if detector is None:
+        detector = Detector(*intrinsics[:7], self.detector._reorient, *intrinsics[7:])
+    self.detector = detector.to(self.density)
+    self._level = self.level_of_detail()
+    while len(self._detectors) > self.max_cached_detectors:
+        self._detectors.popitem(last=False)
+
+
+def _detector_key(intrinsics: Detector | tuple):
+    """Key a detector by its intrinsic parameters, rounding floats to the precision in which they are stored."""
+    if isinstance(intrinsics, Detector):
+        d = intrinsics
+        intrinsics = (
+            d.sdd,
+            d.height,
+            d.width,
+            d.delx,
+            d.dely,
+            -d.x0,
+            -d.y0,
+            d.n_subsample,
+        )
+        intrinsics += (d.reverse_x_axis, d.subsample_method, d.resample)
+    return tuple(
+        float(np.float32(x)) if isinstance(x, float) else x for x in intrinsics
+    )
+
+# %% ../notebooks/api/00_drr.ipynb 14
 @patch
 def rescale_detector_(self: DRR, scale: float):
     """Rescale the detector plane (inplace)."""
@@ -246,9 +866,97 @@ def rescale_detector_(self: DRR, scale: float):
         width=int(self.detector.width * scale),
         delx=float(self.detector.delx / scale),
         dely=float(self.detector.dely / scale),
+        n_subsample=(
+            int(self.detector.n_subsample * scale**2)
+            if self.detector.n_subsample is not None
+            else None
+        ),
     )
 
-# %% ../notebooks/api/00_drr.ipynb 13
+# %% ../notebooks/api/00_drr.ipynb 15
+from torch.nn.functional import avg_pool2d
+
+
+@patch
+def render_scales(
+    self: DRR,
+    pose: RigidTransform,  # Camera poses
+    scales: list[float],  # Scales of the detector's resolution (e.g., [1, 0.5, 0.25])
+    calibration: RigidTransform = None,  # Optional calibration matrix with the detector's intrinsic parameters
+    mask_to_channels: bool = False,  # If True, structures from the CT mask are rendered in separate channels
+    **kwargs,  # Passed to the renderer
+):
+    """Render DRRs at multiple detector resolutions, reusing finer images to compute coarser ones."""
+    if not self.reshape or self.detector.n_subsample is not None:
+        raise ValueError(
+            "Rendering multiple scales requires full images (`reshape=True` without subsampling)"
+        )
+
+    imgs = {}
+    for scale in sorted(set(scales), reverse=True):
+        height = int(self.detector.height * scale)
+        width = int(self.detector.width * scale)
+
+        # A coarser image is the average of blocks of pixels in a finer image if the blocks tile the finer image
+        # (i.e., the finer image supersamples the coarser one), which is much cheaper than rendering it
+        for finer, img in reversed(imgs.items()):
+            factor = round(finer / scale)
+            if math.isclose(finer / scale, factor) and img.shape[-2:] == (
+                factor * height,
+                factor * width,
+            ):
+                imgs[scale] = avg_pool2d(img, factor)
+                break
+        else:
+            imgs[scale] = self._render_rescaled(
+                scale, pose, calibration, mask_to_channels, **kwargs
+            )
+    return [imgs[scale] for scale in scales]
+
+
+@patch
+def _render_rescaled(self: DRR, scale, pose, calibration, mask_to_channels, **kwargs):
+    """Render DRRs with a rescaled detector (coarser detectors render from coarser levels of the volume's pyramid)."""
+    if scale == 1:
+        return self(
+            pose, calibration=calibration, mask_to_channels=mask_to_channels, **kwargs
+        )
+    if calibration is not None:
+        raise ValueError(
+            "Cannot render a custom calibration at a scale that is not pooled from a finer image"
+        )
+
+    # The rescaled detector is cached, so rendering the same scales again does not rebuild it
+    detector = self.detector
+    self.rescale_detector_(scale)
+    try:
+        return self(pose, mask_to_channels=mask_to_channels, **kwargs)
+    finally:
+        self._detectors[_detector_key(self.detector)] = self.detector
+        self._detectors.pop(_detector_key(detector), None)
+        self.detector = detector
+        self._level = self.level_of_detail()
+
+# %% ../notebooks/api/00_drr.ipynb 16
+from .metrics import Sobel
+
+
+@patch
+def set_importance_(
+    self: DRR,
+    img: torch.Tensor,  # Fixed X-ray with shape (B, C, H, W)
+    uniform: float = 0.1,  # Proportion of the probability mass spread uniformly over the detector
+):
+    """Importance sample pixels proportionally to the magnitude of the image gradients of a fixed X-ray (inplace)."""
+    if self.detector.n_subsample is None:
+        raise ValueError(
+            "Importance sampling requires subsampling pixels with `p_subsample`"
+        )
+    img = img.reshape(-1, 1, self.detector.height, self.detector.width)
+    edges = Sobel(sigma=1.0).to(img)(img).norm(dim=1)
+    self.detector.sampler.set_importance_(edges, uniform)
+
+# %% ../notebooks/api/00_drr.ipynb 17
 @patch
 def perspective_projection(
     self: DRR,
@@ -272,10 +980,7 @@ def perspective_projection(
 
     return x[..., :2]
 
-# %% ../notebooks/api/00_drr.ipynb 14
-from torch.nn.functional import pad
-
-
+# %% ../notebooks/api/00_drr.ipynb 18
 @patch
 def inverse_projection(
     self: DRR,
@@ -293,3 +998,19 @@ def inverse_projection(
     )
     extrinsic = self.detector.reorient.compose(pose)
     return extrinsic(x)
+
+# %% ../notebooks/api/00_drr.ipynb 19
+@patch
+def render_pixels(
+    self: DRR,
+    pose: RigidTransform,  # Camera poses
+    uv: torch.Tensor,  # Pixel coordinates with shape (B, N, 2) or (N, 2), which can be fractional
+    mask_to_channels: bool = False,  # If True, structures from the CT mask are rendered in separate channels
+    **kwargs,  # Passed to the renderer
+):
+    """Render the rays cast through arbitrary pixel coordinates, returning an image with shape (B, C, N)."""
+    # Pixel coordinates follow `perspective_projection`, i.e., (u, v) = (col + 0.5, row + 0.5) for the center of a pixel
+    uv = uv.expand(len(pose.matrix), -1, -1).to(self.detector.source)
+    target = self.inverse_projection(pose, uv.clone())
+    source = self.detector.reorient.compose(pose)(self.detector.source)
+    return self.render(self.density, source, target, mask_to_channels, **kwargs)
@@ -1,11 +1,14 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../notebooks/api/01_renderers.ipynb.
 
 # %% auto 0
-__all__ = ['Siddon', 'Trilinear']
+__all__ = ['Siddon', 'Trilinear', 'DistanceDriven']
 
 # %% ../notebooks/api/01_renderers.ipynb 3
+import math
+from functools import partial
+
 import torch
-from torch.nn.functional import grid_sample
+from torch.nn.functional import avg_pool3d, grid_sample, max_pool3d, normalize, pad
 
 # %% ../notebooks/api/01_renderers.ipynb 7
 class Siddon(torch.nn.Module):
@@ -16,7 +19,9 @@ class Siddon(torch.nn.Module):
         mode: str = "nearest",  # Interpolation mode for grid_sample
         stop_gradients_through_grid_sample: bool = False,  # Apply torch.no_grad when calling grid_sample
         filter_intersections_outside_volume: bool = True,  # Use alphamin/max to filter the intersections
-        reducefn: str = "sum",  # Function for combining samples along each ray
+        reducefn: str = "sum",  # Function for combining samples along each ray (or a list of functions rendered as separate channels)
+        memory_efficient: bool = False,  # Recompute intermediate tensors in the backward pass instead of storing them
+        chunk_size: int = 8192,  # Number of rays to render at once if `memory_efficient=True`
         eps: float = 1e-8,  # Small constant to avoid div by zero errors
     ):
         super().__init__()
@@ -24,10 +29,19 @@ class Siddon(torch.nn.Module):
         self.stop_gradients_through_grid_sample = stop_gradients_through_grid_sample
         self.filter_intersections_outside_volume = filter_intersections_outside_volume
         self.reducefn = reducefn
+        self.memory_efficient = memory_efficient
+        self.chunk_size = chunk_size
         self.eps = eps
 
     def dims(self, volume):
-        return torch.tensor(volume.shape).to(volume)
+        return torch.tensor(_get_shape(volume)).to(volume)
+
+    def memory_per_ray(self, volume, **kwargs):
+        """Estimate the memory (in bytes) needed to render a single ray."""
+        n_intersections = (
+            sum(_get_shape(volume)) + 5
+        )  # Upper bound on the number of intersections
+        return 16 * n_intersections * volume.element_size()
 
     def forward(
         self,
@@ -37,16 +51,102 @@ class Siddon(torch.nn.Module):
         img,
         align_corners=False,
         mask=None,
+        occupancy=None,
+        n_channels=None,
+    ):
+        if self.memory_efficient and torch.is_grad_enabled():
+            return _MemoryEfficientRender.apply(
+                partial(self.render, occupancy=occupancy, n_channels=n_channels),
+                self.chunk_size,
+                volume,
+                source,
+                target,
+                img,
+                align_corners,
+                mask,
+            )
+        return self.render(
+            volume, source, target, img, align_corners, mask, occupancy, n_channels
+        )
+
+    def render(
+        self,
+        volume,
+        source,
+        target,
+        img,
+        align_corners=False,
+        mask=None,
+        occupancy=None,
+        n_channels=None,
+    ):
+        xyzs, intersection_length = self.samples(
+            volume, source, target, align_corners, occupancy
+        )
+
+        # Optionally, stop gradients from flowing through the voxels looked up with grid_sample
+        # (gradients still flow through the length of each intersection)
+        if self.stop_gradients_through_grid_sample:
+            volume = volume.detach()
+            xyzs = xyzs.detach()
+            img = img.detach() if img is not None else None
+
+        return _integrate(
+            volume,
+            xyzs,
+            intersection_length,
+            img,
+            self.mode,
+            align_corners,
+            self.reducefn,
+            mask,
+            n_channels,
+        )
+
+    def backproject(
+        self,
+        volume,
+        source,
+        target,
+        img,
+        align_corners=False,
+        mask=None,
+        occupancy=None,
+        n_channels=None,
     ):
+        """Backproject an image along each ray (i.e., the adjoint of rendering `volume` with `img=None`)."""
+        if self.reducefn != "sum":
+            raise ValueError(
+                f"Can only backproject with reducefn 'sum', not {self.reducefn}"
+            )
+        xyzs, intersection_length = self.samples(
+            volume, source, target, align_corners, occupancy
+        )
+        return _backproject(
+            volume, xyzs, intersection_length, img, self.mode, align_corners, mask
+        )
+
+    def samples(self, volume, source, target, align_corners=False, occupancy=None):
+        """Get the midpoint of every voxel intersected by each ray and the length of each intersection."""
         dims = self.dims(volume)
 
+        # Optionally, skip the empty space at the start and end of each ray
+        alphamin = alphamax = None
+        if occupancy is not None and not align_corners:
+            alphamin, alphamax = _get_alpha_minmax(source, target, dims, self.eps)
+            alphamin, alphamax = _clip_to_occupancy(
+                source, target, dims, self.eps, alphamin, alphamax, occupancy
+            )
+
         # Calculate the intersections of each ray with the planes comprising the CT volume
         alphas = _get_alphas(
             source,
             target,
-            dims,
+            _get_shape(volume),
             self.eps,
             self.filter_intersections_outside_volume,
+            alphamin,
+            alphamax,
         )
 
         # Calculate the midpoint of every pair of adjacent intersections
@@ -54,78 +154,154 @@ class Siddon(torch.nn.Module):
         alphamid = (alphas[..., 0:-1] + alphas[..., 1:]) / 2
 
         # Get the XYZ coordinate of each midpoint (normalized to [-1, +1]^3)
-        xyzs = _get_xyzs(alphamid, source, target, dims, self.eps)
-
-        # Use torch.nn.functional.grid_sample to lookup the values of each intersected voxel
-        if self.stop_gradients_through_grid_sample:
-            with torch.no_grad():
-                img = _get_voxel(
-                    volume, xyzs, img, self.mode, align_corners=align_corners
-                )
+        # For nearest neighbour interpolation, directly get the index of the voxel containing each midpoint
+        if self.mode == "nearest" and not align_corners:
+            xyzs = _get_voxel_idxs(alphamid, source, target, volume, self.eps)
         else:
-            img = _get_voxel(volume, xyzs, img, self.mode, align_corners=align_corners)
+            xyzs = _get_xyzs(alphamid, source, target, dims, self.eps)
 
-        # Weight each intersected voxel by the length of the ray's intersection with the voxel
+        # Get the length of the ray's intersection with each voxel
         intersection_length = torch.diff(alphas, dim=-1)
-        img = img * intersection_length
+        return xyzs, intersection_length
 
-        # Handle optional masking
-        if mask is None:
-            img = reduce(img, self.reducefn)
-            img = img.unsqueeze(1)
+# %% ../notebooks/api/01_renderers.ipynb 8
+def _get_alphas(
+    source,
+    target,
+    shape,
+    eps,
+    filter_intersections_outside_volume,
+    alphamin=None,
+    alphamax=None,
+):
+    """Calculates the parametric intersections of each ray with the planes of the CT volume."""
+    # Optionally, only keep the planes each ray intersects between its entry and exit points
+    # (or between the provided alphamin and alphamax)
+    if alphamin is None or alphamax is None:
+        if filter_intersections_outside_volume:
+            dims = torch.tensor(shape).to(source)
+            alphamin, alphamax = _get_alpha_minmax(source, target, dims, eps)
         else:
-            # Thanks to @Ivan for the clutch assist w/ pytorch tensor ops
-            # https://stackoverflow.com/questions/78323859/broadcast-pytorch-array-across-channels-based-on-another-array/78324614#78324614
-            B, D, _ = img.shape
-            C = int(mask.max().item() + 1)
-            channels = _get_voxel(
-                mask, xyzs, img=None, mode=self.mode, align_corners=align_corners
-            ).long()
-            img = (
-                torch.zeros(B, C, D)
-                .to(img)
-                .scatter_add_(1, channels.transpose(-1, -2), img.transpose(-1, -2))
-            )
+            alphamin = alphamax = None
+    if alphamin is not None:
+        alphamin = torch.minimum(
+            alphamin, alphamax
+        )  # Rays that miss the volume have zero length
 
-        return img
+    # Calculate the parametric intersection of each ray with the parallel XYZ planes that comprise the CT volume
+    # Along each axis, the intersections are computed in ascending order
+    planes = [
+        _get_plane_intersections(
+            source[..., idx : idx + 1],
+            target[..., idx : idx + 1],
+            n,
+            eps,
+            alphamin,
+            alphamax,
+        )
+        for idx, n in enumerate(shape)
+    ]
 
-# %% ../notebooks/api/01_renderers.ipynb 8
-def _get_alphas(source, target, dims, eps, filter_intersections_outside_volume):
-    """Calculates the parametric intersections of each ray with the planes of the CT volume."""
-    # Parameterize the parallel XYZ planes that comprise the CT volumes
-    alphax = torch.arange(dims[0] + 1).to(source)
-    alphay = torch.arange(dims[1] + 1).to(source)
-    alphaz = torch.arange(dims[2] + 1).to(source)
-
-    # Calculate the parametric intersection of each ray with every plane
-    sx, sy, sz = source[..., 0:1], source[..., 1:2], source[..., 2:3]
-    tx, ty, tz = target[..., 0:1], target[..., 1:2], target[..., 2:3]
-    alphax = (alphax.expand(len(source), 1, -1) - sx) / (tx - sx + eps)
-    alphay = (alphay.expand(len(source), 1, -1) - sy) / (ty - sy + eps)
-    alphaz = (alphaz.expand(len(source), 1, -1) - sz) / (tz - sz + eps)
-    alphas = torch.cat([alphax, alphay, alphaz], dim=-1)
-
-    # Sort the intersections
-    alphas = torch.sort(alphas, dim=-1).values
-    if filter_intersections_outside_volume:
-        alphas = _filter_intersections_outside_volume(alphas, source, target, dims, eps)
+    # Merge the sorted intersections
+    alphas = _merge_intersections(*planes)
+    if alphamin is not None:
+        # Rays are padded with their exit point, so trim the padding shared by all rays
+        # When compiling, all rays keep a static number of intersections
+        if not torch.compiler.is_compiling():
+            n_intersections = sum(count for *_, count in planes).max().item()
+            alphas = alphas[..., :n_intersections]
+        alphas = torch.concat([alphamin, alphas, alphamax], dim=-1)
     return alphas
 
 
-def _filter_intersections_outside_volume(alphas, source, target, dims, eps):
-    """Remove interesections that are outside of the volume for all rays."""
-    alphamin, alphamax = _get_alpha_minmax(source, target, dims, eps)
-    good_idxs = torch.logical_and(alphamin <= alphas, alphas <= alphamax)
-    alphas = alphas[..., good_idxs.any(dim=[0, 1])]
+def _get_plane_intersections(s, t, n, eps, alphamin=None, alphamax=None):
+    """Calculates the intersections of each ray with the planes {0, ..., n} orthogonal to a single axis."""
+    # Rays travelling in the negative direction intersect the planes in reverse order
+    d = t - s + eps
+    reverse = d < 0
+
+    # Affine map from a parametric coordinate to the index of a plane (in the order it is intersected)
+    slope = d.abs()
+    offset = torch.where(reverse, n - s, s)
+
+    # Find the range of planes each ray intersects between alphamin and alphamax
+    if alphamin is None:
+        start = torch.zeros_like(s)
+        count = torch.full_like(s, n + 1)
+    else:
+        start = torch.addcmul(offset, alphamin, slope).clamp_(0, n + 1).ceil_()
+        stop = torch.addcmul(offset, alphamax, slope).clamp_(-1, n).floor_() + 1
+        count = (stop - start).clamp_(min=0)
+    n_planes = n + 1 if torch.compiler.is_compiling() else int(count.max().item())
+    idxs = start + torch.arange(n_planes).to(s)
+
+    planes = torch.addcmul(
+        torch.where(reverse, n, 0).to(s),
+        idxs,
+        torch.where(reverse, -1, 1).to(s),
+    )
+    alphas = (planes - s) / d
+    if alphamin is not None:
+        # Rays with fewer intersections are padded with their exit point
+        alphas = alphas.clamp(alphamin, alphamax)
+
+    # Also return the affine map from a parametric coordinate to the number of planes preceding it
+    return alphas, slope, offset - start, count.long()
+
+
+def _merge_intersections(x, y, z):
+    """Merge three sets of sorted intersections in linear time (i.e., without a full sort)."""
+    (alphax, *_), (alphay, *_), (alphaz, *_) = x, y, z
+    nx, ny, nz = alphax.shape[-1], alphay.shape[-1], alphaz.shape[-1]
+
+    # For every intersection, count the intersections in the other sets that precede it
+    # The reverse counts are derived from the forward counts so the ranks always form a permutation
+    xy = _count_preceding(alphax, y)
+    xz = _count_preceding(alphax, z)
+    yz = _count_preceding(alphay, z)
+    xrank = (xy + xz).add_(torch.arange(nx, device=xy.device))
+    yrank = _count_following(xy, ny).add_(yz).add_(torch.arange(ny, device=yz.device))
+    zrank = _count_following(xz, nz).add_(_count_following(yz, nz))
+    zrank = zrank.add_(torch.arange(nz, device=zrank.device))
+
+    # Scatter the intersections into their merged positions
+    alphas = torch.empty(*alphax.shape[:-1], nx + ny + nz).to(alphax)
+    alphas.scatter_(-1, xrank, alphax)
+    alphas.scatter_(-1, yrank, alphay)
+    alphas.scatter_(-1, zrank, alphaz)
+
+    # Near-ties may be counted out of order in floating point, so repair any affected rays
+    if torch.compiler.is_compiling():
+        return alphas.cummax(dim=-1).values
+    unsorted = (alphas[..., 1:] < alphas[..., :-1]).any(dim=-1)
+    if unsorted.any():
+        alphas[unsorted] = alphas[unsorted].cummax(dim=-1).values
     return alphas
 
 
-def _get_alpha_minmax(source, target, dims, eps):
-    """Calculate the first and last intersections of each ray with the volume."""
+def _count_preceding(alphas, planes):
+    """Count the number of intersections with a set of planes that precede each alpha."""
+    _, slope, offset, count = planes
+    return (
+        torch.addcmul(offset, alphas, slope).clamp_(min=0).ceil_().long().minimum(count)
+    )
+
+
+def _count_following(counts, n):
+    """Given the number of `b` intersections preceding each `a` intersection, count the `a` intersections preceding each `b`."""
+    histogram = torch.zeros(*counts.shape[:-1], n + 1).to(counts)
+    histogram = histogram.scatter_add_(-1, counts, torch.ones_like(counts))
+    return histogram.cumsum(dim=-1)[..., :n]
+
+
+def _get_alpha_minmax(source, target, dims, eps, lower=None, upper=None):
+    """Calculate the first and last intersections of each ray with the volume (or a box within it)."""
     sdd = target - source + eps
 
-    alpha0 = (torch.zeros(3).to(source) - source) / sdd
-    alpha1 = ((dims + 1).to(source) - source) / sdd
+    lower = torch.zeros(3) if lower is None else lower
+    upper = dims + 1 if upper is None else upper
+    alpha0 = (lower.to(source) - source) / sdd
+    alpha1 = (upper.to(source) - source) / sdd
     alphas = torch.stack([alpha0, alpha1])
 
     alphamin = alphas.min(dim=0).values.max(dim=-1).values.unsqueeze(-1)
@@ -149,22 +325,305 @@ def _get_xyzs(alpha, source, target, dims, eps):
     return xyzs
 
 
+def _get_voxel_idxs(alpha, source, target, volume, eps):
+    """Given a set of rays and parametric coordinates, calculates the flattened index of the voxel containing each point."""
+    # Index voxels in the (Z, Y, X) layout sampled by the renderer
+    # Points outside the volume are assigned an index of -1
+    shape = _get_shape(volume)
+    strides = [1, shape[0], shape[0] * shape[1]]
+    dtype = torch.int32 if volume.numel() < 2**31 else torch.int64
+    sdd = target - source + eps
+    idxs = inbounds = None
+    for idx, (n, stride) in enumerate(zip(shape, strides)):
+        # Get the voxel coordinate of every point parameterized by alpha along each axis
+        xyz = torch.addcmul(
+            source[..., idx : idx + 1], alpha, sdd[..., idx : idx + 1]
+        ).floor_()
+        valid = (xyz >= 0) & (xyz < n)
+        xyz = xyz.to(dtype).mul_(stride)
+        idxs = xyz if idxs is None else idxs.add_(xyz)
+        inbounds = valid if inbounds is None else inbounds.logical_and_(valid)
+    return idxs.masked_fill_(~inbounds, -1)
+
+
 def _get_voxel(volume, xyzs, img, mode, align_corners):
-    """Wraps torch.nn.functional.grid_sample to sample a volume at XYZ coordinates."""
-    batch_size = len(xyzs)
-    voxels = grid_sample(
-        input=volume.permute(2, 1, 0)[None, None].expand(batch_size, -1, -1, -1, -1),
-        grid=xyzs,
-        mode=mode,
-        align_corners=align_corners,
-    )[:, 0, 0]
+    """Wraps torch.nn.functional.grid_sample to sample a volume at XYZ coordinates (or voxel indices)."""
+    volume = _prepare_volume(volume)
+    if xyzs.is_floating_point():
+        voxels = grid_sample(
+            input=volume,
+            grid=_get_grid(volume, xyzs),
+            mode=mode,
+            align_corners=align_corners,
+        )
+        voxels = voxels[:, 0, 0] if len(volume) > 1 else voxels[0, 0]
+    else:
+        # Gather voxels by index, treating points outside the volume as zero
+        voxels = volume.flatten()[_get_batch_idxs(volume, xyzs)]
+        voxels = torch.where(xyzs >= 0, voxels, 0)
     if img is not None:
         img = torch.einsum("bcn, bnj -> bnj", img, voxels)
     else:
         img = voxels
     return img
 
-# %% ../notebooks/api/01_renderers.ipynb 9
+
+def _put_voxel(volume, xyzs, values, mode, align_corners):
+    """Adjoint of `_get_voxel`: accumulates the values sampled at XYZ coordinates (or voxel indices) into a volume."""
+    prepared = _prepare_volume(volume)
+    if xyzs.is_floating_point():
+        # Use the backward pass of grid_sample, which scatters into the same voxels that were sampled
+        with torch.enable_grad():
+            zeros = torch.zeros(prepared.shape).to(values).requires_grad_()
+            voxels = grid_sample(
+                input=zeros,
+                grid=_get_grid(prepared, xyzs),
+                mode=mode,
+                align_corners=align_corners,
+            )
+            voxels = voxels[:, 0, 0] if len(prepared) > 1 else voxels[0, 0]
+            (adjoint,) = torch.autograd.grad(voxels, zeros, values.expand_as(voxels))
+    else:
+        # Scatter values by index, ignoring points outside the volume
+        adjoint = (
+            torch.zeros(prepared.numel())
+            .to(values)
+            .index_add_(
+                0,
+                _get_batch_idxs(prepared, xyzs).flatten(),
+                torch.where(xyzs >= 0, values, 0).flatten(),
+            )
+            .view(prepared.shape)
+        )
+    if volume.dim() < 5:
+        adjoint = _get_raw_volume(adjoint)
+    return adjoint
+
+
+def _get_grid(volume, xyzs):
+    """Arrange the XYZ coordinates of a batch of rays into the grid sampled from a prepared volume."""
+    # A batch of volumes is sampled at the points of its own rays
+    # Otherwise, the batch of rays is folded into the depth dimension of the grid so the volume is not expanded
+    return xyzs if len(volume) > 1 else xyzs.transpose(0, 1)
+
+
+def _get_batch_idxs(volume, idxs):
+    """Offset the voxel indices of a batch of rays into the flattened batch of prepared volumes they sample."""
+    idxs = idxs.clamp(min=0)
+    if len(volume) > 1:
+        offsets = torch.arange(len(volume), device=idxs.device) * volume[0].numel()
+        idxs = idxs + offsets.to(idxs).view(-1, *[1] * (idxs.dim() - 1))
+    return idxs
+
+
+def _integrate(
+    volume, xyzs, weights, img, mode, align_corners, reducefn, mask, n_channels
+):
+    """Sum the voxels sampled along each ray, weighting each sample by the length of the ray it represents."""
+    # Use torch.nn.functional.grid_sample to lookup the values of each sampled voxel
+    img = _get_voxel(volume, xyzs, img, mode, align_corners=align_corners)
+    img = img * weights
+
+    # Every reduction shares the same samples and is returned in a separate channel
+    reducefns = reducefn if isinstance(reducefn, (list, tuple)) else [reducefn]
+
+    # Handle optional masking
+    if mask is None:
+        img = torch.stack([reduce(img, fn) for fn in reducefns], dim=1)
+    else:
+        C = _get_n_channels(mask, n_channels)
+        channels = _get_voxel(
+            mask, xyzs, img=None, mode=mode, align_corners=align_corners
+        ).long()
+        img = torch.cat(
+            [reduce_channels(img, channels, C, fn) for fn in reducefns], dim=1
+        )
+
+    return img
+
+
+def _backproject(volume, xyzs, weights, img, mode, align_corners, mask):
+    """Adjoint of `_integrate` with respect to the volume (with `img=None` and `reducefn="sum"`)."""
+    # Get the value of the image along each ray, taking the channel from the label of each sampled voxel
+    img = img.transpose(-1, -2)
+    if mask is not None:
+        channels = _get_voxel(
+            mask, xyzs, img=None, mode=mode, align_corners=align_corners
+        )
+        img = img.gather(-1, channels.long())
+    return _put_voxel(volume, xyzs, img * weights, mode, align_corners)
+
+
+def _get_voxel_weights(volume, xyzs, weights, mode, align_corners):
+    """Get the flattened index of every voxel contributing to each sample along each ray and the weight of its contribution."""
+    if not xyzs.is_floating_point():
+        return xyzs, weights.expand_as(xyzs)
+
+    # Get the voxels interpolated by grid_sample at each XYZ coordinate
+    # Voxels are indexed in the (Z, Y, X) layout sampled by the renderer
+    xyzs = xyzs.squeeze(1)
+    idxs = torch.zeros(*xyzs.shape[:-1], 1, dtype=torch.int64, device=xyzs.device)
+    interp = torch.ones(*xyzs.shape[:-1], 1).to(xyzs)
+    stride = 1
+    for idx, n in enumerate(_get_shape(volume)):
+        # Unnormalize the coordinates from [-1, +1] to voxel indices
+        coord = xyzs[..., idx]
+        if align_corners:
+            coord = (coord + 1) / 2 * (n - 1)
+        else:
+            coord = ((coord + 1) * n - 1) / 2
+
+        # Get the neighbouring voxels along this axis and their interpolation weights
+        if mode == "nearest":
+            corners = coord.round().unsqueeze(-1)
+            corner_weights = torch.ones_like(corners)
+        else:
+            lower = coord.floor()
+            corners = torch.stack([lower, lower + 1], dim=-1)
+            corner_weights = torch.stack([1 - (coord - lower), coord - lower], dim=-1)
+        corner_weights = corner_weights * ((corners >= 0) & (corners < n))
+        corners = corners.clamp(0, n - 1).long()
+
+        # Take the outer product with the neighbours along the previous axes
+        idxs = (idxs.unsqueeze(-1) + stride * corners.unsqueeze(-2)).flatten(-2)
+        interp = (interp.unsqueeze(-1) * corner_weights.unsqueeze(-2)).flatten(-2)
+        stride *= n
+
+    # Out-of-bounds voxels have zero weight
+    idxs = idxs.masked_fill(interp == 0, -1)
+    return idxs.flatten(-2), (interp * weights.unsqueeze(-1)).flatten(-2)
+
+
+def _prepare_volume(volume):
+    """Permute a (X, Y, Z) volume (or a (B, X, Y, Z) batch of volumes) into the (B, 1, Z, Y, X) layout expected by grid_sample."""
+    if volume.dim() == 3:
+        volume = volume.permute(2, 1, 0)[None, None]
+    elif volume.dim() == 4:
+        volume = volume.permute(0, 3, 2, 1)[:, None]
+    return volume
+
+
+def _get_raw_volume(volume):
+    """Get the (X, Y, Z) view of a raw or prepared volume (or the (B, X, Y, Z) view of a batch of volumes)."""
+    if volume.dim() == 5:
+        volume = volume[:, 0].permute(0, 3, 2, 1)
+        if len(volume) == 1:
+            volume = volume[0]
+    return volume
+
+
+def _get_shape(volume):
+    """Get the (X, Y, Z) shape of a raw or prepared volume."""
+    if volume.dim() in [3, 4]:
+        return tuple(volume.shape[-3:])
+    return tuple(volume.shape[:-4:-1])
+
+
+def _get_n_channels(mask, n_channels=None):
+    """Get the number of structures in a mask (if not already known)."""
+    if n_channels is None:
+        n_channels = int(mask.max().item() + 1)
+    return n_channels
+
+# %% ../notebooks/api/01_renderers.ipynb 10
+def _get_occupancy(volume, brick_size=8):
+    """Summarize the nonzero region of a volume with a bounding box and a coarse grid of bricks."""
+    # Dilate the nonzero region by one voxel so interpolated samples near nonzero voxels are also occupied
+    # The volume is first padded by one voxel since these samples can lie just outside the volume
+    volume = pad(_prepare_volume(volume).detach().abs(), (0, 1, 0, 1, 0, 1))
+    volume = max_pool3d(volume, kernel_size=3, stride=1, padding=1)
+
+    # Get the bounding box of the occupied voxels (in each volume of a batch)
+    occupied = volume[:, 0] > 0
+    lower, upper = torch.zeros(len(volume), 3), torch.zeros(len(volume), 3)
+    for idx, dim in enumerate([(1, 2), (1, 3), (2, 3)]):
+        nonzero = occupied.any(dim=dim).cpu()
+        coords = torch.arange(nonzero.shape[-1]).expand_as(nonzero)
+        lower[:, idx] = torch.where(nonzero, coords, nonzero.shape[-1]).amin(dim=-1)
+        upper[:, idx] = torch.where(nonzero, coords + 1, 0).amax(dim=-1)
+        lower[:, idx] = lower[:, idx].minimum(
+            upper[:, idx]
+        )  # Empty volumes have an empty box at the origin
+    lower, upper = (
+        (lower[0], upper[0]) if len(volume) == 1 else (lower[:, None], upper[:, None])
+    )
+
+    # Get the maximum density in each brick of the volume
+    bricks = max_pool3d(
+        volume, kernel_size=brick_size, stride=brick_size, ceil_mode=True
+    )
+    return lower, upper, bricks, brick_size
+
+
+def _clip_to_occupancy(source, target, dims, eps, alphamin, alphamax, occupancy):
+    """Clip the parametric range of each ray to the occupied region of the volume."""
+    lower, upper, bricks, brick_size = occupancy
+
+    # Clip each ray to the bounding box of the occupied voxels
+    boxmin, boxmax = _get_alpha_minmax(source, target, dims, eps, lower, upper)
+    alphamin = torch.maximum(alphamin, boxmin)
+    alphamax = torch.minimum(alphamax, boxmax)
+
+    # Trace each ray through the grid of bricks (parametric coordinates are invariant to scaling the volume)
+    source = source / brick_size
+    target = target / brick_size
+    alphas = _get_alphas(
+        source, target, _get_shape(bricks), eps, True, alphamin, alphamax
+    )
+    alphamid = (alphas[..., 0:-1] + alphas[..., 1:]) / 2
+    idxs = _get_voxel_idxs(alphamid, source, target, bricks, eps)
+    occupied = _get_voxel(bricks, idxs, None, "nearest", False) > 0
+
+    # Skip the empty bricks at the start and end of each ray
+    # Rays that only intersect empty bricks are assigned zero length
+    first = occupied.int().argmax(dim=-1, keepdim=True)
+    last = occupied.shape[-1] - occupied.flip(-1).int().argmax(dim=-1, keepdim=True)
+    alphamin = alphas.gather(-1, first)
+    alphamax = torch.where(
+        occupied.any(dim=-1, keepdim=True), alphas.gather(-1, last), alphamin
+    )
+    return alphamin, alphamax
+
+# %% ../notebooks/api/01_renderers.ipynb 12
+def _get_pyramid(volume, n_levels, labels=False):
+    """Downsample a volume by factors of 2 into the levels of a mip-style pyramid (excluding the full-resolution level)."""
+    volume = _prepare_volume(volume).detach()
+    pyramid = []
+    for _ in range(1, n_levels):
+        # Pad odd dimensions with empty space so each coarse voxel covers exactly 2x2x2 fine voxels
+        Z, Y, X = volume.shape[-3:]
+        volume = pad(volume, (0, X % 2, 0, Y % 2, 0, Z % 2))
+        if labels:
+            volume = _downsample_labels(volume)
+        else:
+            volume = avg_pool3d(volume, kernel_size=2)
+        pyramid.append(volume.contiguous())
+    return pyramid
+
+
+def _get_pyramid_adjoint(volume, shape, level):
+    """Adjoint of downsampling a volume with `shape` to a level of its pyramid (spreads each coarse voxel evenly over the fine voxels it covers)."""
+    shapes = [tuple(shape[-3:])]
+    for _ in range(level):
+        shapes.append(tuple(-(-n // 2) for n in shapes[-1]))
+    for Z, Y, X in shapes[-2::-1]:
+        for dim in [-3, -2, -1]:
+            volume = volume.repeat_interleave(2, dim=dim)
+        volume = volume[..., :Z, :Y, :X] / 8
+    return volume
+
+
+def _downsample_labels(mask):
+    """Downsample a labelmap by assigning each 2x2x2 block of voxels its most frequent label."""
+    best = torch.zeros_like(mask[..., ::2, ::2, ::2])
+    count = torch.full_like(best, -1.0)
+    for label in mask.unique():
+        frequency = avg_pool3d((mask == label).to(mask), kernel_size=2)
+        best = torch.where(frequency > count, label, best)
+        count = torch.maximum(frequency, count)
+    return best
+
+# %% ../notebooks/api/01_renderers.ipynb 13
 from typing import Callable
 
 
@@ -178,23 +637,180 @@ def reduce(img, reducefn):
     else:
         raise ValueError(f"Only supports reducefn 'sum' or 'max', not {reducefn}")
 
-# %% ../notebooks/api/01_renderers.ipynb 11
+
+def reduce_channels(img, channels, n_channels, reducefn):
+    """Reduce the samples along each ray separately for every structure in the mask."""
+    B, D, _ = img.shape
+    if reducefn == "sum":
+        # Thanks to @Ivan for the clutch assist w/ pytorch tensor ops
+        # https://stackoverflow.com/questions/78323859/broadcast-pytorch-array-across-channels-based-on-another-array/78324614#78324614
+        return (
+            torch.zeros(B, n_channels, D)
+            .to(img)
+            .scatter_add_(1, channels.transpose(-1, -2), img.transpose(-1, -2))
+        )
+    elif reducefn == "max":
+        return (
+            torch.zeros(B, n_channels, D)
+            .to(img)
+            .scatter_reduce_(
+                1, channels.transpose(-1, -2), img.transpose(-1, -2), reduce="amax"
+            )
+        )
+    elif isinstance(reducefn, Callable):
+        return torch.stack(
+            [
+                reducefn(torch.where(channels == channel, img, 0))
+                for channel in range(n_channels)
+            ],
+            dim=1,
+        )
+    else:
+        raise ValueError(f"Only supports reducefn 'sum' or 'max', not {reducefn}")
+
+# %% ../notebooks/api/01_renderers.ipynb 14
+class _MemoryEfficientRender(torch.autograd.Function):
+    """Render rays in chunks without storing intermediate tensors, recomputing them chunk-by-chunk in the backward pass."""
+
+    @staticmethod
+    def forward(
+        ctx, render, chunk_size, volume, source, target, img, align_corners, mask
+    ):
+        ctx.render = render
+        ctx.chunk_size = chunk_size
+        ctx.align_corners = align_corners
+        ctx.save_for_backward(volume, source, target, img, mask)
+        return torch.concat(
+            [
+                render(
+                    volume, *_get_chunk(source, target, img, chunk), align_corners, mask
+                )
+                for chunk in _get_chunks(target.shape[1], chunk_size)
+            ],
+            dim=-1,
+        )
+
+    @staticmethod
+    @torch.autograd.function.once_differentiable
+    def backward(ctx, grad):
+        volume, source, target, img, mask = ctx.saved_tensors
+        inputs = [volume, source, target, img]
+        needs_grad = [
+            x is not None and requires_grad
+            for x, requires_grad in zip(inputs, ctx.needs_input_grad[2:6])
+        ]
+        grads = [
+            torch.zeros_like(x) if requires_grad else None
+            for x, requires_grad in zip(inputs, needs_grad)
+        ]
+
+        # Recompute the forward pass for each chunk of rays and backpropagate through it
+        for chunk in _get_chunks(target.shape[1], ctx.chunk_size):
+            partials = [volume, *_get_chunk(source, target, img, chunk)]
+            partials = [
+                x.detach().requires_grad_() if requires_grad else x
+                for x, requires_grad in zip(partials, needs_grad)
+            ]
+            with torch.enable_grad():
+                out = ctx.render(*partials, ctx.align_corners, mask)
+            partials = [
+                x for x, requires_grad in zip(partials, needs_grad) if requires_grad
+            ]
+            partials = iter(torch.autograd.grad(out, partials, grad[..., chunk]))
+
+            # Accumulate the gradients of inputs shared by all rays (e.g., the volume or a single source)
+            for jdx, (x, requires_grad) in enumerate(zip(inputs, needs_grad)):
+                if not requires_grad:
+                    continue
+                x_grad = _get_chunk(*grads[1:], chunk)[jdx - 1] if jdx > 0 else grads[0]
+                x_grad += next(partials)
+
+        return None, None, *grads, None, None
+
+
+def _get_chunks(n_rays, chunk_size):
+    """Split the rays into contiguous chunks."""
+    return [slice(idx, idx + chunk_size) for idx in range(0, n_rays, chunk_size)]
+
+
+def _get_chunk(source, target, img, chunk):
+    """Get a chunk of rays, broadcasting any inputs shared by all rays."""
+    source = source[:, chunk] if source is not None and source.shape[1] > 1 else source
+    target = target[:, chunk] if target is not None and target.shape[1] > 1 else target
+    img = img[..., chunk] if img is not None and img.shape[-1] > 1 else img
+    return source, target, img
+
+# %% ../notebooks/api/01_renderers.ipynb 15
+class _LinearRender(torch.autograd.Function):
+    """Render a volume without recording a graph, computing its gradient by backprojecting the gradient of the image."""
+
+    @staticmethod
+    def forward(ctx, renderer, kwargs, volume, source, target, img):
+        kwargs = dict(kwargs)
+        mask = kwargs.pop("mask", None)
+        n_channels = kwargs.pop("n_channels", None)
+        align_corners = kwargs.get("align_corners", False)
+        with torch.no_grad():
+            xyzs, weights = renderer.samples(volume, source, target, **kwargs)
+            out = _integrate(
+                volume,
+                xyzs,
+                weights,
+                img,
+                renderer.mode,
+                align_corners,
+                renderer.reducefn,
+                mask,
+                n_channels,
+            )
+
+        # Keep the samples along each ray so they are not recomputed in the backward pass
+        ctx.mode = renderer.mode
+        ctx.align_corners = align_corners
+        ctx.save_for_backward(volume, xyzs, weights, img, mask)
+        return out
+
+    @staticmethod
+    def backward(ctx, grad):
+        volume, xyzs, weights, img, mask = ctx.saved_tensors
+        grad_volume = _backproject(
+            volume, xyzs, weights, grad * img, ctx.mode, ctx.align_corners, mask
+        )
+        return None, None, grad_volume, None, None, None
+
+# %% ../notebooks/api/01_renderers.ipynb 17
 class Trilinear(torch.nn.Module):
     """Differentiable X-ray renderer implemented with trilinear interpolation."""
 
     def __init__(
         self,
         mode: str = "bilinear",  # Interpolation mode for grid_sample
-        reducefn: str = "sum",  # Function for combining samples along each ray
+        reducefn: str = "sum",  # Function for combining samples along each ray (or a list of functions rendered as separate channels)
+        samples_per_voxel: float = 2.0,  # Sampling density along each ray if `n_points="auto"`
+        pose_only_gradients: bool = True,  # If only the rays require gradients, compute them from the spatial gradient of the volume at each sample
         eps: float = 1e-8,  # Small constant to avoid div by zero errors
     ):
         super().__init__()
         self.mode = mode
         self.reducefn = reducefn
+        self.samples_per_voxel = samples_per_voxel
+        self.pose_only_gradients = pose_only_gradients
         self.eps = eps
 
     def dims(self, volume):
-        return torch.tensor(volume.shape).to(volume)
+        return torch.tensor(_get_shape(volume)).to(volume)
+
+    def memory_per_ray(self, volume, n_points=500, **kwargs):
+        """Estimate the memory (in bytes) needed to render a single ray."""
+        if n_points == "auto":
+            n_points = self.max_n_points(volume)
+        return 12 * n_points * volume.element_size()
+
+    def max_n_points(self, volume):
+        """Number of points used with `n_points="auto"`, enough to sample any ray through the volume with `samples_per_voxel`."""
+        # The number of points only depends on the shape of the volume, so the value of a ray does not depend on
+        # the other rays rendered with it (e.g., the chunk or the other poses in the batch)
+        return int(self.samples_per_voxel * (max(_get_shape(volume)) + 1)) + 1
 
     def forward(
         self,
@@ -207,42 +823,429 @@ class Trilinear(torch.nn.Module):
         mask=None,
         alphamin=None,
         alphamax=None,
+        occupancy=None,
+        n_channels=None,
+    ):
+        if self.differentiate_pose_only(volume, source, target):
+            if alphamin is None or alphamax is None:
+                alphamin, alphamax = self.alpha_minmax(
+                    volume, source, target, align_corners, occupancy
+                )
+            kwargs = dict(
+                n_points=n_points,
+                align_corners=align_corners,
+                mask=mask,
+                n_channels=n_channels,
+            )
+            return _PoseOnlyRender.apply(
+                self, kwargs, volume, source, target, img, alphamin, alphamax
+            )
+
+        xyzs, step_size = self.samples(
+            volume,
+            source,
+            target,
+            n_points,
+            align_corners,
+            alphamin,
+            alphamax,
+            occupancy,
+        )
+
+        # Sample the volume with trilinear interpolation and integrate with the rectangular rule
+        return _integrate(
+            volume,
+            xyzs,
+            step_size,
+            img,
+            self.mode,
+            align_corners,
+            self.reducefn,
+            mask,
+            n_channels,
+        )
+
+    def backproject(
+        self,
+        volume,
+        source,
+        target,
+        img,
+        n_points=500,
+        align_corners=False,
+        mask=None,
+        alphamin=None,
+        alphamax=None,
+        occupancy=None,
+        n_channels=None,
+    ):
+        """Backproject an image along each ray (i.e., the adjoint of rendering `volume` with `img=None`)."""
+        if self.reducefn != "sum":
+            raise ValueError(
+                f"Can only backproject with reducefn 'sum', not {self.reducefn}"
+            )
+        xyzs, step_size = self.samples(
+            volume,
+            source,
+            target,
+            n_points,
+            align_corners,
+            alphamin,
+            alphamax,
+            occupancy,
+        )
+        return _backproject(
+            volume, xyzs, step_size, img, self.mode, align_corners, mask
+        )
+
+    def differentiate_pose_only(self, volume, source, target):
+        """Check if gradients are only needed for the rays (i.e., not for the volume)."""
+        return (
+            self.pose_only_gradients
+            and torch.is_grad_enabled()
+            and not volume.requires_grad
+            and (source.requires_grad or target.requires_grad)
+            and self.reducefn == "sum"
+            and not torch.compiler.is_compiling()
+        )
+
+    def alpha_minmax(self, volume, source, target, align_corners=False, occupancy=None):
+        """Get the parametric coordinates of the first and last points sampled along each ray."""
+        dims = self.dims(volume)
+        alphamin, alphamax = _get_alpha_minmax(source, target, dims, self.eps)
+        if occupancy is not None and not align_corners:
+            alphamin, alphamax = _clip_to_occupancy(
+                source, target, dims, self.eps, alphamin, alphamax, occupancy
+            )
+
+        # Rays that miss the volume have zero length
+        alphamin = torch.minimum(alphamin, alphamax)
+        return alphamin, alphamax
+
+    def samples(
+        self,
+        volume,
+        source,
+        target,
+        n_points=500,
+        align_corners=False,
+        alphamin=None,
+        alphamax=None,
+        occupancy=None,
     ):
+        """Get the points sampled along each ray and the step size between them."""
         dims = self.dims(volume)
 
-        # Sample points along the rays and rescale to [-1, 1]
+        # Sample points along each ray between its entry and exit points and rescale to [-1, 1]
         if alphamin is None or alphamax is None:
-            alphamin, alphamax = _get_alpha_minmax(source, target, dims, self.eps)
-            alphamin = alphamin.min()
-            alphamax = alphamax.max()
+            alphamin, alphamax = self.alpha_minmax(
+                volume, source, target, align_corners, occupancy
+            )
+        if n_points == "auto":
+            n_points = self.max_n_points(volume)
         alphas = torch.linspace(0, 1, n_points)[None, None].to(volume)
         alphas = alphas * (alphamax - alphamin) + alphamin
 
-        # Render the DRR
         # Get the XYZ coordinate of each alpha, normalized for grid_sample
         xyzs = _get_xyzs(alphas, source, target, dims, self.eps)
 
-        # Sample the volume with trilinear interpolation
-        img = _get_voxel(volume, xyzs, img, self.mode, align_corners=align_corners)
+        # Get each ray's step size to compute the rectangular rule for integration
+        step_size = (alphamax - alphamin) / (n_points - 1)
+        return xyzs, step_size
+
+# %% ../notebooks/api/01_renderers.ipynb 19
+class _PoseOnlyRender(torch.autograd.Function):
+    """Render a volume with trilinear interpolation, computing the gradients of the rays (but not the volume) in closed form."""
+
+    @staticmethod
+    def forward(ctx, renderer, kwargs, volume, source, target, img, alphamin, alphamax):
+        kwargs = dict(kwargs)
+        mask = kwargs.pop("mask", None)
+        n_channels = kwargs.pop("n_channels", None)
+        n_points = kwargs.get("n_points", 500)
+        align_corners = kwargs.get("align_corners", False)
+        with torch.no_grad():
+            xyzs, step_size = renderer.samples(
+                volume, source, target, n_points, align_corners, alphamin, alphamax
+            )
+
+        # Only record the graph of the sampled voxels with respect to their positions
+        with torch.enable_grad():
+            xyzs.requires_grad_()
+            voxels = _get_voxel(
+                volume.detach(), xyzs, None, renderer.mode, align_corners=align_corners
+            )
+
+        # Integrate the density along each ray (in every channel) before scaling by the ray lengths
+        with torch.no_grad():
+            integral = voxels * step_size
+            if mask is None:
+                channels = None
+                integral = integral.sum(dim=-1).unsqueeze(1)
+            else:
+                C = _get_n_channels(mask, n_channels)
+                channels = _get_voxel(
+                    mask, xyzs, None, renderer.mode, align_corners=align_corners
+                ).long()
+                integral = reduce_channels(integral, channels, C, "sum")
+            out = integral * img if img is not None else integral
+
+        ctx.xyzs = xyzs
+        ctx.voxels = voxels
+        ctx.eps = renderer.eps
+        ctx.save_for_backward(
+            renderer.dims(volume),
+            source,
+            target,
+            img,
+            alphamin,
+            alphamax,
+            channels,
+            integral,
+        )
+        return out
+
+    @staticmethod
+    @torch.autograd.function.once_differentiable
+    def backward(ctx, grad):
+        xyzs, voxels = ctx.xyzs, ctx.voxels
+        dims, source, target, img, alphamin, alphamax, channels, integral = (
+            ctx.saved_tensors
+        )
+        grad_img = None
+        if img is not None:
+            if ctx.needs_input_grad[5]:
+                grad_img = (
+                    (grad * integral).sum(dim=1, keepdim=True).sum_to_size(img.shape)
+                )
+            grad = grad * img
 
-        # Multiply by the step size to compute the rectangular rule for integration
+        # Weight each sample by the gradient of the channel it is rendered in
+        grad = grad.transpose(1, 2)
+        weights = grad.gather(-1, channels) if channels is not None else grad
+        n_points = voxels.shape[-1]
         step_size = (alphamax - alphamin) / (n_points - 1)
-        img = img * step_size
+        grad_step_size = (weights * voxels.detach()).sum(dim=-1, keepdim=True)
+
+        # Get the spatial gradient of the volume at every sample (in voxel coordinates)
+        # The recorded graph is retained (and freed along with the outer graph) so backward can be called again
+        (grad_xyzs,) = torch.autograd.grad(
+            voxels, xyzs, (weights * step_size).expand_as(voxels), retain_graph=True
+        )
+        grad_xyzs = grad_xyzs[:, 0] * (2 / dims)
+
+        # Differentiate each sample with respect to the source, target, and entry/exit points of its ray
+        t = torch.linspace(0, 1, n_points).to(alphamin)
+        alphas = torch.addcmul(alphamin, t, alphamax - alphamin)
+        grad_target = torch.einsum("bnkd, bnk -> bnd", grad_xyzs, alphas)
+        grad_source = grad_xyzs.sum(dim=-2) - grad_target
+        grad_alphas = torch.einsum(
+            "bnkd, bnd -> bnk", grad_xyzs, target - source + ctx.eps
+        )
+        grad_alphamax = (grad_alphas * t).sum(dim=-1, keepdim=True)
+        grad_alphamin = grad_alphas.sum(dim=-1, keepdim=True) - grad_alphamax
+
+        # Moving the entry/exit points also changes the step size
+        grad_alphamax = grad_alphamax + grad_step_size / (n_points - 1)
+        grad_alphamin = grad_alphamin - grad_step_size / (n_points - 1)
+
+        return (
+            None,
+            None,
+            None,
+            grad_source.sum_to_size(source.shape) if ctx.needs_input_grad[3] else None,
+            grad_target.sum_to_size(target.shape) if ctx.needs_input_grad[4] else None,
+            grad_img,
+            grad_alphamin if ctx.needs_input_grad[6] else None,
+            grad_alphamax if ctx.needs_input_grad[7] else None,
+        )
+
+# %% ../notebooks/api/01_renderers.ipynb 21
+class DistanceDriven(torch.nn.Module):
+    """Differentiable X-ray renderer implemented with a voxel-driven, distance-driven projector."""
+
+    voxel_driven = True
+
+    def __init__(
+        self,
+        voxels_per_chunk: int = 2**21,  # Number of voxels to project at once
+        bins_per_voxel: int = 2,  # Number of virtual pixels spanned by the smallest voxel footprint
+        eps: float = 1e-8,  # Small constant to avoid div by zero errors
+    ):
+        super().__init__()
+        self.voxels_per_chunk = voxels_per_chunk
+        self.bins_per_voxel = bins_per_voxel
+        self.eps = eps
+
+    def dims(self, volume):
+        return torch.tensor(_get_shape(volume)).to(volume)
 
-        # Handle optional masking
-        if mask is None:
-            img = reduce(img, self.reducefn)
-            img = img.unsqueeze(1)
+    def memory_per_ray(self, volume, **kwargs):
+        """Estimate the memory (in bytes) needed to render a single ray."""
+        return 16 * volume.element_size()
+
+    def forward(
+        self,
+        volume,
+        source,
+        target,
+        img,
+        align_corners=False,
+        mask=None,
+        occupancy=None,
+        n_channels=None,
+    ):
+        if source.shape[1] != 1:
+            raise ValueError(
+                "DistanceDriven only supports cone-beam geometries with a single source per view"
+            )
+
+        # Get the volume in (X, Y, Z) layout (or a batch of volumes, one for each view)
+        volume = _get_raw_volume(volume)
+        if mask is not None:
+            C = _get_n_channels(mask, n_channels)
+            mask = _get_raw_volume(mask).long()
         else:
-            B, D, _ = img.shape
-            C = int(mask.max().item() + 1)
-            channels = _get_voxel(
-                mask, xyzs, img=None, mode=self.mode, align_corners=align_corners
-            ).long()
-            img = (
-                torch.zeros(B, C, D)
-                .to(img)
-                .scatter_add_(1, channels.transpose(-1, -2), img.transpose(-1, -2))
-            )
-
-        return img
+            C = 1
+
+        # Project the volume onto a virtual detector for each view
+        img_ = []
+        for idx, (s, t) in enumerate(zip(source, target)):
+            # Crop the volume to the occupied voxels
+            vol = volume[idx] if volume.dim() == 4 else volume
+            lower = torch.zeros(3, dtype=torch.int64)
+            upper = torch.tensor(vol.shape)
+            if occupancy is not None:
+                bounds = [
+                    x.reshape(-1, 3)[idx if x.dim() > 1 else 0] for x in occupancy[:2]
+                ]
+                lower = bounds[0].long().clamp(max=upper)
+                upper = torch.minimum(bounds[1].long(), upper)
+            crop = tuple(
+                slice(lo, hi) for lo, hi in zip(lower.tolist(), upper.tolist())
+            )
+            labels = None
+            if mask is not None:
+                labels = (mask[idx] if mask.dim() == 4 else mask)[crop]
+            img_.append(
+                _project(
+                    vol[crop],
+                    labels,
+                    C,
+                    lower,
+                    s[0],
+                    t,
+                    self.voxels_per_chunk,
+                    self.bins_per_voxel,
+                    self.eps,
+                )
+            )
+        img_ = torch.stack(img_)
+        if img is not None:
+            img_ = img_ * img
+        return img_
+
+# %% ../notebooks/api/01_renderers.ipynb 22
+def _project(
+    volume, mask, C, lower, source, target, voxels_per_chunk, bins_per_voxel, eps
+):
+    # Construct a virtual detector plane orthogonal to the ray through the center of the volume
+    # (it only depends on the source and the volume, so the value of a ray does not depend on the other rays)
+    upper = lower + torch.tensor(volume.shape)
+    corners = (
+        torch.cartesian_prod(*torch.stack([lower, upper], dim=-1)).to(source) - source
+    )
+    normal = normalize(corners.mean(dim=0), dim=0)
+    helper = torch.eye(3).to(normal)[normal.abs().argmin()]
+    u = normalize(torch.linalg.cross(normal, helper), dim=0)
+    v = torch.linalg.cross(normal, u)
+    sdd = corners.mean(dim=0) @ normal
+
+    # Get the coordinates of the targets on the virtual detector
+    rays = target - source
+    depth = rays @ normal
+    tu = (rays @ u) * sdd / depth
+    tv = (rays @ v) * sdd / depth
+
+    # Choose the size of the virtual pixels so the smallest footprint of a voxel spans `bins_per_voxel` pixels
+    # and every voxel overlaps at most K x K virtual pixels
+    depths = (corners @ normal).clamp(min=eps)
+    footprint = u.abs().sum(), v.abs().sum()
+    h = min(footprint) * sdd / depths.max() / bins_per_voxel
+    K = math.ceil((max(footprint) * sdd / depths.min() / h).item()) + 1
+
+    # Cover the projection of the volume with the virtual detector
+    cu = (corners @ u) * sdd / depths
+    cv = (corners @ v) * sdd / depths
+    umin, umax, vmin, vmax = cu.min(), cu.max(), cv.min(), cv.max()
+    u0, v0 = umin - h, vmin - h
+    nu = math.ceil(((umax - umin) / h).item()) + 3
+    nv = math.ceil(((vmax - vmin) / h).item()) + 3
+
+    # Splat every voxel onto the virtual detector
+    X, Y, Z = volume.shape
+    values = volume.reshape(-1)
+    channels = mask.reshape(-1) if mask is not None else None
+    image = torch.zeros(C * nv * nu).to(values)
+    for start in range(0, len(values), voxels_per_chunk):
+        idx = torch.arange(
+            start, min(start + voxels_per_chunk, len(values)), device=values.device
+        )
+        xyz = torch.stack([idx // (Y * Z), (idx // Z) % Y, idx % Z], dim=-1) + lower.to(
+            idx
+        )
+        xyz = xyz.to(source) + 0.5 - source
+
+        # Project the center and footprint of each voxel
+        zs = xyz @ normal
+        magnification = sdd / zs.clamp(min=eps)
+        pu = (xyz @ u) * magnification
+        pv = (xyz @ v) * magnification
+        wu = u.abs().sum() * magnification
+        wv = v.abs().sum() * magnification
+
+        # Weight each voxel by its density and the inverse square of its distance to the source
+        weight = values[idx] * (zs > 0) / (xyz * xyz).sum(dim=-1)
+
+        # Compute the overlap of each voxel's footprint with the virtual pixels
+        iu, fu = _get_overlaps(pu, wu, u0, h, K)
+        iv, fv = _get_overlaps(pv, wv, v0, h, K)
+        offset = channels[idx] * (nv * nu) if channels is not None else 0
+        for du in range(K):
+            for dv in range(K):
+                col, row = iu + du, iv + dv
+                valid = (col >= 0) & (col < nu) & (row >= 0) & (row < nv)
+                cell = torch.where(valid, offset + row * nu + col, 0)
+                image = image.index_add(0, cell, weight * fu[du] * fv[dv] * valid)
+
+    # Convert the splatted mass to the mean line integral over each virtual pixel
+    # by dividing by the solid angle of the pixel
+    cu = u0 + (torch.arange(nu).to(source) + 0.5) * h
+    cv = v0 + (torch.arange(nv).to(source) + 0.5) * h
+    distance = (sdd**2 + cu[None] ** 2 + cv[:, None] ** 2).sqrt()
+    solid_angle = h**2 * sdd / distance**3
+    image = image.view(C, nv, nu) / solid_angle
+
+    # Sample the virtual detector at the targets with bilinear interpolation
+    grid = torch.stack(
+        [2 * (tu - u0) / (h * nu) - 1, 2 * (tv - v0) / (h * nv) - 1], dim=-1
+    )
+    img = grid_sample(
+        image[None], grid[None, None], mode="bilinear", align_corners=False
+    )[0, :, 0]
+
+    # Normalize by the length of each ray (in voxel coordinates) to match the parametric integral
+    return img / rays.norm(dim=-1)
+
+
+def _get_overlaps(p, w, origin, h, K):
+    """Distance-driven overlap of the footprint [p - w / 2, p + w / 2] with K adjacent virtual pixels."""
+    left = (p - w / 2 - origin) / h
+    right = (p + w / 2 - origin) / h
+    idx = left.floor()
+    fracs = [
+        (right.clamp(max=idx + k + 1) - left.clamp(min=idx + k)).clamp(min=0)
+        / (right - left)
+        for k in range(K)
+    ]
+    return idx.long(), fracs
@@ -105,12 +105,16 @@ from .pose import RigidTransform
 def get_pinhole_camera(
     drr: DRR, pose: RigidTransform, dtype: torch.dtype = torch.float64
 ) -> PinholeCamera:
+    if drr.density.dim() == 4:
+        raise ValueError("Cannot make a pinhole camera for a batch of volumes")
+
     # Move everything to CPU and use double precision
     drr = deepcopy(drr).to(device="cpu", dtype=dtype)
     pose = deepcopy(pose).to(device="cpu", dtype=dtype)
+    subject = drr.subject[0] if isinstance(drr.subject, (list, tuple)) else drr.subject
 
     # Make the intrinsic matrix (in pixels)
-    multiplier = -1 if drr.subject.orientation == "AP" else 1
+    multiplier = -1 if subject.orientation == "AP" else 1
     fx = multiplier * drr.detector.sdd / drr.detector.delx
     fy = multiplier * drr.detector.sdd / drr.detector.dely
     u0 = drr.detector.x0 / drr.detector.delx + drr.detector.width / 2
@@ -128,7 +132,7 @@ def get_pinhole_camera(
     )
 
     # Get matching 3D and 2D points for PnP
-    (xmin, xmax), (ymin, ymax), (zmin, zmax) = drr.subject.volume.get_bounds()
+    (xmin, xmax), (ymin, ymax), (zmin, zmax) = subject.volume.get_bounds()
     X = torch.tensor(
         [
             [
@@ -157,7 +161,7 @@ def get_pinhole_camera(
         torch.tensor([drr.detector.height]),
         torch.tensor([drr.detector.width]),
         drr.detector,
-        drr.subject,
+        subject,
     )
 
     return camera
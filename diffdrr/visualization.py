@@ -388,11 +388,15 @@ def visualize_scene(
     Given a DRR and a RigidTransform, render the 3D scene in PyVista.
     **kwargs are passed to drr_to_mesh.
     """
+    if drr.density.dim() == 4:
+        raise ValueError("Cannot visualize the scene of a batch of volumes")
+    subject = drr.subject[0] if isinstance(drr.subject, (list, tuple)) else drr.subject
+
     # Extract a mesh from the subject
     if labelmap:
-        mesh = labelmap_to_mesh(drr.subject, verbose=verbose)
+        mesh = labelmap_to_mesh(subject, verbose=verbose)
     else:
-        mesh = drr_to_mesh(drr.subject, "surface_nets", verbose=verbose, **kwargs)
+        mesh = drr_to_mesh(subject, "surface_nets", verbose=verbose, **kwargs)
 
     # Plot on a grid
     pl = pyvista.Plotter()
@@ -162,7 +162,7 @@ def run_convergence_exp(
             if drr_moving.detector.n_subsample is not None:
                 loss = criterion(
                     estimate,
-                    ground_truth[:, drr_moving.detector.subsamples[-1]],
+                    ground_truth[..., drr_moving.detector.sampler.idxs],
                 )
             else:
                 loss = criterion(